@@ -0,0 +1,176 @@
+"""
+Headless batch research runner
+
+Reads queries from a JSONL file (one {"id": ..., "query": ...} object per line; "id" defaults
+to the line number) and runs them through SearchManager with bounded parallelism. Refinement
+questions are never asked: the refactor agent finalizes the query instead.
+
+Each finished report is appended to the output JSONL as soon as it is ready, so the output
+file is also the checkpoint: running the same command again skips every id already in it and
+retries the queries that failed. Per-query stats (status, time, searches, tokens) go to a
+separate JSONL file.
+
+    python src/batch.py queries.jsonl --output reports.jsonl --stats stats.jsonl --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+from config import load_env
+
+from progress import ERROR, SEARCH
+from search_manager import SearchManager
+
+load_env()
+
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    skipped: int = 0      # Already in the output from an earlier run
+    succeeded: int = 0
+    failed: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.total} queries: {self.succeeded} done, {self.failed} failed, {self.skipped} already done"
+
+
+def read_queries(path: str) -> list[dict]:
+    queries = []
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"query": entry}
+            entry["id"] = str(entry.get("id", line_number))
+            queries.append(entry)
+    return queries
+
+
+def finished_ids(path: str) -> set[str]:
+    """Ids already written to the output; a line cut short by an interruption is ignored."""
+    if not os.path.exists(path):
+        return set()
+    ids = set()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                ids.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return ids
+
+
+class JsonlWriter:
+    """Appends one JSON object per line and flushes it, so finished work survives an interruption."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, entry: dict) -> None:
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def run_query(entry: dict, **manager_options) -> tuple[dict | None, dict]:
+    """Runs one query to completion; returns its output line (None on failure) and its stats line."""
+    manager = SearchManager(interactive_refinement=False, **manager_options)
+    events = manager.events.subscribe()
+    start = time.monotonic()
+    stats = {"id": entry["id"], "query": entry["query"]}
+    output = None
+    try:
+        report = await manager.run(entry["query"])
+        output = {"id": entry["id"], "query": entry["query"], "report": report.model_dump()}
+        stats["status"] = "ok"
+    except Exception as e:
+        stats["status"] = "error"
+        stats["error"] = repr(e)
+    finally:
+        manager.close()
+        events.close()
+    drained = events.drain()
+    calls = manager.last_run_calls
+    stats.update({
+        "seconds": round(time.monotonic() - start, 3),
+        "searches": sum(event.kind == SEARCH for event in drained),
+        "errors": sum(event.kind == ERROR for event in drained),
+        "agent_calls": len(calls),
+        "input_tokens": sum(call.input_tokens for call in calls),
+        "output_tokens": sum(call.output_tokens for call in calls),
+    })
+    return output, stats
+
+
+async def run_batch(input_path: str, output_path: str, stats_path: str, concurrency: int = BATCH_CONCURRENCY,
+                    **manager_options) -> BatchSummary:
+    """Runs every query of `input_path` not yet in `output_path`, at most `concurrency` at a time.
+
+    `manager_options` are passed on to each SearchManager.
+    """
+    queries = read_queries(input_path)
+    done = finished_ids(output_path)
+    summary = BatchSummary(total=len(queries))
+    pending = [entry for entry in queries if entry["id"] not in done]
+    summary.skipped = summary.total - len(pending)
+    semaphore = asyncio.Semaphore(concurrency)
+    output = JsonlWriter(output_path)
+    stats_output = JsonlWriter(stats_path)
+
+    async def one(entry: dict) -> None:
+        async with semaphore:
+            logger.info(f"Starting {entry['id']}: {entry['query']}")
+            result, stats = await run_query(entry, **manager_options)
+        if result is not None:
+            output.write(result)
+            summary.succeeded += 1
+        else:
+            summary.failed += 1
+        stats_output.write(stats)
+        logger.info(f"Finished {entry['id']} ({stats['status']}) in {stats['seconds']:.1f}s")
+
+    try:
+        await asyncio.gather(*(one(entry) for entry in pending))
+    finally:
+        output.close()
+        stats_output.close()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one query per line")
+    parser.add_argument("--output", help="JSONL file for the reports (default: <input>.reports.jsonl)")
+    parser.add_argument("--stats", help="JSONL file for per-query stats (default: <input>.stats.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Queries researched at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    # Only the batch progress is printed; the pipeline's own log lines are kept for warnings.
+    logging.getLogger("search_manager").setLevel(logging.WARNING)
+    stem = os.path.splitext(args.input)[0]
+    summary = asyncio.run(run_batch(
+        args.input,
+        args.output or f"{stem}.reports.jsonl",
+        args.stats or f"{stem}.stats.jsonl",
+        args.concurrency,
+    ))
+    print(summary)
+    sys.exit(1 if summary.failed else 0)
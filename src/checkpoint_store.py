@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', '.cache/checkpoints.sqlite3')
+CHECKPOINT_TTL_SECONDS = float(os.getenv('CHECKPOINT_TTL_SECONDS', '86400'))
+
+# Stages saved while a run progresses
+REFINED_QUERY = "refined_query"   # Keyed by the normalized query (prefixed for interactive runs)
+PLAN = "plan"
+SEARCH_RESULT = "search_result"   # One entry per search, keyed by the normalized search query
+
+
+class CheckpointStore:
+    """Stage outputs of unfinished runs, keyed by trace id, so a failed run can resume.
+
+    Values are stored as JSON in a SQLite file; entries older than the TTL are purged on
+    startup. Pass `path=None` to keep the checkpoints in memory only. Writes are not synced
+    to disk one by one (WAL with synchronous=NORMAL): a checkpoint lost in a power failure
+    only means redoing a step. Methods are thread-safe, so they can be called through
+    `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str | None = CHECKPOINT_PATH, ttl_seconds: float = CHECKPOINT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.RLock()   # One connection shared by the worker threads
+        self._running: set[str] = set()  # Runs in progress in this process, never taken for resuming
+
+    def _connect(self) -> sqlite3.Connection:
+        # The database is opened on first use so importing this module has no side effects.
+        if self._db is None:
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "trace_id TEXT NOT NULL, stage TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (trace_id, stage, key))"
+            )
+            self._db.execute("DELETE FROM checkpoints WHERE updated_at <= ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        return self._db
+
+    def save(self, trace_id: str, stage: str, value, key: str = "") -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO checkpoints (trace_id, stage, key, value, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (trace_id, stage, key, json.dumps(value), time.time()),
+            )
+            db.commit()
+
+    def get(self, trace_id: str, stage: str, key: str = ""):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM checkpoints WHERE trace_id = ? AND stage = ? AND key = ?", (trace_id, stage, key)
+            ).fetchone()
+            return json.loads(row[0]) if row is not None else None
+
+    def count(self, trace_id: str, stage: str) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE trace_id = ? AND stage = ?", (trace_id, stage)
+            ).fetchone()[0]
+
+    def keys(self, trace_id: str, stage: str) -> set[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key FROM checkpoints WHERE trace_id = ? AND stage = ?", (trace_id, stage)
+            ).fetchall()
+            return {key for (key,) in rows}
+
+    def start(self, trace_id: str) -> None:
+        """Marks a run as in progress so that `take_unfinished` leaves it alone."""
+        with self._lock:
+            self._running.add(trace_id)
+
+    def finish(self, trace_id: str) -> None:
+        with self._lock:
+            self._running.discard(trace_id)
+
+    def take_unfinished(self, stage: str, key: str) -> tuple[str, object] | None:
+        """(trace id, value) of the most recent run not in progress with a `stage` checkpoint under `key`.
+
+        The run is marked as in progress, so concurrent callers never resume the same run.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT trace_id, value FROM checkpoints WHERE stage = ? AND key = ? ORDER BY updated_at DESC",
+                (stage, key),
+            ).fetchall()
+            for trace_id, value in rows:
+                if trace_id not in self._running:
+                    self._running.add(trace_id)
+                    return trace_id, json.loads(value)
+            return None
+
+    def clear(self, trace_id: str) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM checkpoints WHERE trace_id = ?", (trace_id,))
+            db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Shared by every SearchManager in the process.
+checkpoint_store = CheckpointStore()
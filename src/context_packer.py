@@ -0,0 +1,147 @@
+import os
+import re
+from dataclasses import dataclass
+
+WRITER_TOKEN_BUDGET = int(os.getenv('WRITER_TOKEN_BUDGET', '6000'))
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.6'))
+
+SHINGLE_SIZE = 3
+CHARS_PER_TOKEN = 4   # Rough average for English text; good enough for budgeting
+
+
+@dataclass
+class PackedContext:
+    text: str
+    input_tokens: int          # Estimated tokens of the raw search results
+    packed_tokens: int         # Estimated tokens of the packed text
+    duplicates_dropped: int    # Sentences removed as near-duplicates
+    truncated: bool            # True if content had to be cut to fit the budget
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_summary(text: str) -> list[str]:
+    """Splits a search summary into clean paragraphs with collapsed whitespace."""
+    paragraphs = re.split(r"\n\s*\n", text.replace("\r\n", "\n").strip())
+    return [" ".join(paragraph.split()) for paragraph in paragraphs if paragraph.strip()]
+
+
+def split_sentences(paragraph: str) -> list[str]:
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", paragraph) if sentence]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> frozenset:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def deduplicate(results: list[list[str]], threshold: float = DUPLICATE_THRESHOLD) -> tuple[list[list[str]], int]:
+    """Drops sentences that are near-duplicates of a sentence kept earlier, in any result.
+
+    `results` is a list of results, each a list of paragraphs. Paragraphs left empty are removed.
+    """
+    seen: list[frozenset] = []
+    dropped = 0
+    deduplicated = []
+    for paragraphs in results:
+        kept_paragraphs = []
+        for paragraph in paragraphs:
+            kept_sentences = []
+            for sentence in split_sentences(paragraph):
+                sentence_shingles = shingles(sentence)
+                if any(similarity(sentence_shingles, other) >= threshold for other in seen):
+                    dropped += 1
+                    continue
+                seen.append(sentence_shingles)
+                kept_sentences.append(sentence)
+            if kept_sentences:
+                kept_paragraphs.append(" ".join(kept_sentences))
+        deduplicated.append(kept_paragraphs)
+    return deduplicated, dropped
+
+
+def novelty(existing: list[str], new: list[str], threshold: float = DUPLICATE_THRESHOLD) -> float:
+    """Share of the sentences in `new` that are not near-duplicates of `existing` (or of each other)."""
+    new_results = [normalize_summary(result) for result in new]
+    total = sum(len(split_sentences(paragraph)) for paragraphs in new_results for paragraph in paragraphs)
+    if total == 0:
+        return 0.0
+    # Existing results are deduplicated first, so every sentence dropped below comes from `new`.
+    existing_results, _ = deduplicate([normalize_summary(result) for result in existing], threshold)
+    _, dropped = deduplicate(existing_results + new_results, threshold)
+    return 1 - dropped / total
+
+
+def allocate_budget(sizes: list[int], budget: int) -> list[int]:
+    """Splits `budget` across results so short results keep everything and long ones share the rest."""
+    allocation = [0] * len(sizes)
+    remaining = budget
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        allocation[index] = min(sizes[index], share)
+        remaining -= allocation[index]
+    return allocation
+
+
+def truncate_paragraphs(paragraphs: list[str], token_budget: int) -> list[str]:
+    """Keeps whole sentences, in order, until `token_budget` estimated tokens are used."""
+    kept = []
+    used = 0
+    for paragraph in paragraphs:
+        sentences = []
+        for sentence in split_sentences(paragraph):
+            tokens = estimate_tokens(sentence) + 1
+            if used + tokens > token_budget:
+                if sentences:
+                    kept.append(" ".join(sentences))
+                return kept
+            sentences.append(sentence)
+            used += tokens
+        kept.append(" ".join(sentences))
+    return kept
+
+
+def pack_search_results(query: str, search_results: list[str], token_budget: int = WRITER_TOKEN_BUDGET,
+                        threshold: float = DUPLICATE_THRESHOLD) -> PackedContext:
+    """Builds the writer input from the search summaries.
+
+    Summaries are normalized, near-duplicate sentences across results are dropped and the
+    remainder is cut to `token_budget` estimated tokens, shared fairly between results.
+    """
+    input_tokens = sum(estimate_tokens(result) for result in search_results)
+    results, dropped = deduplicate([normalize_summary(result) for result in search_results], threshold)
+
+    header = f"Original query: {query}\n\nSearch results:\n"
+    sizes = [sum(estimate_tokens(paragraph) + 1 for paragraph in paragraphs) for paragraphs in results]
+    available = max(0, token_budget - estimate_tokens(header) - 10 * len(results))
+    truncated = sum(sizes) > available
+    if truncated:
+        results = [
+            truncate_paragraphs(paragraphs, budget)
+            for paragraphs, budget in zip(results, allocate_budget(sizes, available))
+        ]
+
+    sections = [header]
+    for index, paragraphs in enumerate(results, 1):
+        if paragraphs:
+            sections.append(f"### Result {index}\n\n" + "\n\n".join(paragraphs) + "\n")
+    text = "\n".join(sections)
+    return PackedContext(
+        text=text,
+        input_tokens=input_tokens,
+        packed_tokens=estimate_tokens(text),
+        duplicates_dropped=dropped,
+        truncated=truncated,
+    )
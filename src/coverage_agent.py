@@ -0,0 +1,28 @@
+import os
+from pydantic import BaseModel, Field
+from agents import Agent
+from config import load_env
+from planner_agent import WebSearchItem
+
+load_env()
+model = os.getenv('AI_MODEL', '')
+
+
+INSTRUCTION = "You are a research lead reviewing the research done so far. Given the original query and \
+the summaries of the searches already performed, decide whether they cover the query well enough to \
+write a thorough report. If important aspects are missing, list follow-up web searches that fill \
+those gaps, most important first. Do not repeat searches that were already performed, and do not ask \
+for more searches when the existing results already answer the query."
+
+class CoverageAssessment(BaseModel):
+    is_sufficient: bool = Field(description="Whether the existing search results cover the query well enough.")
+    missing_aspects: list[str] = Field(description="Aspects of the query that the results do not cover yet.")
+    searches: list[WebSearchItem] = Field(description="Follow-up searches that fill the gaps, most important first.")
+
+
+coverage_agent = Agent(
+    name="coverage_agent",
+    instructions=INSTRUCTION,
+    model=model,
+    output_type=CoverageAssessment,
+    )
@@ -0,0 +1,299 @@
+"""
+Offline model backend for the agents SDK.
+
+FakeModelProvider returns schema-valid outputs for every agent of the pipeline without
+calling any API, with configurable latency and failure rates per agent role. It is used by
+the tests and benchmarks, and by the app itself when MODEL_BACKEND=fake.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+from dataclasses import dataclass, field
+
+from agents import Model, ModelProvider, ModelResponse, ModelSettings, ModelTracing, RunConfig, Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'openai')
+
+# Agent roles, recognised from the output type the agent asks for
+REFINEMENT = "refinement"
+REFACTOR = "refactor"
+PLANNER = "planner"
+SEARCH = "search"
+WRITER = "writer"
+COVERAGE = "coverage"
+OUTLINE = "outline"
+SECTION = "section"
+SUMMARY = "summary"
+
+_ROLE_BY_OUTPUT = {
+    "RefinementQuestion": REFINEMENT,
+    "RefinedQuery": REFACTOR,
+    "WebSearchPlan": PLANNER,
+    "ResearchReport": WRITER,
+    "CoverageAssessment": COVERAGE,
+    "ReportOutline": OUTLINE,
+    "ReportSection": SECTION,
+    "ReportSummary": SUMMARY,
+}
+
+
+class FakeModelError(RuntimeError):
+    """Raised by the fake model to simulate a provider failure (e.g. a 429 or a timeout)."""
+
+    status_code = 429   # Retryable, like the rate limit errors it stands in for
+
+
+@dataclass
+class FakeModelConfig:
+    # Median latency in seconds per role; the actual latency is log-normally distributed around it.
+    latency: dict[str, float] = field(default_factory=lambda: {
+        REFINEMENT: 1.0, REFACTOR: 1.0, PLANNER: 2.0, SEARCH: 5.0, WRITER: 20.0, COVERAGE: 2.0,
+        OUTLINE: 2.0, SECTION: 5.0, SUMMARY: 2.0,
+    })
+    latency_sigma: float = 0.3          # Spread of the log-normal latency distribution
+    latency_scale: float = 1.0          # Multiplies every latency, e.g. 0.01 for fast tests
+    failure_rate: dict[str, float] = field(default_factory=dict)   # Probability of FakeModelError per call
+    question_probability: float = 0.0   # Probability that the refinement agent asks a question first
+    searches: int = 3                   # Items in each generated WebSearchPlan
+    coverage_gaps: int = 1              # Coverage assessments that report gaps before the coverage is sufficient
+    report_sections: int = 5            # Sections in each generated ResearchReport
+    stream_chunk_chars: int = 24        # Size of the text deltas when streaming
+    seed: int | None = None
+
+    @classmethod
+    def from_env(cls) -> "FakeModelConfig":
+        config = cls()
+        config.latency_scale = float(os.getenv('FAKE_MODEL_LATENCY_SCALE', '1.0'))
+        config.question_probability = float(os.getenv('FAKE_MODEL_QUESTION_PROBABILITY', '0.0'))
+        failure_rate = float(os.getenv('FAKE_MODEL_FAILURE_RATE', '0.0'))
+        if failure_rate:
+            config.failure_rate = {role: failure_rate for role in config.latency}
+        return config
+
+
+def _input_text(input) -> str:
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        content = item.get("content") if isinstance(item, dict) else getattr(item, "content", None)
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+def _topic(text: str) -> str:
+    match = re.search(r"Original query: (.+)", text)
+    topic = match.group(1) if match else text.strip().split("\n")[0]
+    return " ".join(topic.split()[:12]) or "the topic"
+
+
+class FakeModel(Model):
+
+    def __init__(self, config: FakeModelConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+
+    def _role(self, output_schema, tools) -> str:
+        if output_schema is not None and not output_schema.is_plain_text():
+            return _ROLE_BY_OUTPUT.get(output_schema.name(), WRITER)
+        return SEARCH
+
+    async def _simulate_call(self, role: str) -> None:
+        median = self.config.latency.get(role, 1.0) * self.config.latency_scale
+        if median > 0:
+            await asyncio.sleep(self.rng.lognormvariate(0, self.config.latency_sigma) * median)
+        if self.rng.random() < self.config.failure_rate.get(role, 0.0):
+            raise FakeModelError(f"Simulated {role} model failure")
+
+    def _output(self, role: str, text: str, handoffs) -> tuple[str | None, ResponseFunctionToolCall | None]:
+        """Returns either the output text or a handoff call for the given agent role."""
+        topic = _topic(text)
+        if role == REFINEMENT:
+            answered = "Answer:" in text
+            if not answered and self.rng.random() < self.config.question_probability:
+                return json.dumps({
+                    "original_query": topic,
+                    "question": [f"Which aspect of {topic} matters most to you?"],
+                    "answer": [],
+                    "reason": "The query is broad.",
+                    "is_final": False,
+                }), None
+            if handoffs:
+                handoff = handoffs[0]
+                return None, ResponseFunctionToolCall(
+                    type="function_call", name=handoff.tool_name, arguments="{}",
+                    call_id=f"call_{self.rng.getrandbits(32):08x}", id=f"fc_{self.rng.getrandbits(32):08x}",
+                    status="completed",
+                )
+            return json.dumps({
+                "original_query": topic, "question": [], "answer": [], "reason": "Specific enough.", "is_final": True,
+            }), None
+        if role == REFACTOR:
+            return json.dumps({"reason": "Made the query more specific.", "query": f"{topic} overview and recent developments"}), None
+        if role == PLANNER:
+            match = re.search(r"Maximum number of searches: (\d+)", text)
+            searches = min(self.config.searches, int(match.group(1))) if match else self.config.searches
+            return json.dumps({"searches": [
+                {"reason": f"Covers aspect {i} of the query.", "query": f"{topic} aspect {i}"}
+                for i in range(1, searches + 1)
+            ]}), None
+        if role == COVERAGE:
+            # Each follow-up round adds its searches to the list of those already performed.
+            performed = len(re.findall(r"^- ", text, re.MULTILINE))
+            round = performed // max(1, self.config.searches)
+            if round > self.config.coverage_gaps:
+                return json.dumps({"is_sufficient": True, "missing_aspects": [], "searches": []}), None
+            return json.dumps({
+                "is_sufficient": False,
+                "missing_aspects": [f"gap {round}"],
+                "searches": [
+                    {"reason": "Fills a coverage gap.", "query": f"{topic} gap {round}.{i}"}
+                    for i in range(1, self.config.searches + 1)
+                ],
+            }), None
+        if role == OUTLINE:
+            return json.dumps({"title": topic, "sections": [
+                {"heading": f"Section {i}: {topic}", "description": f"Aspect {i} of {topic}."}
+                for i in range(1, self.config.report_sections + 1)
+            ]}), None
+        if role == SECTION:
+            match = re.search(r"Section to write: (.+)", text)
+            return json.dumps({"markdown_content": self._section(match.group(1) if match else topic, topic)}), None
+        if role == SUMMARY:
+            return json.dumps({
+                "short_summary": f"A summary of the research on {topic}.",
+                "follow_up_questions": [f"What is next for {topic}?", f"Who are the main players in {topic}?"],
+            }), None
+        if role == WRITER:
+            sections = "\n\n".join(
+                self._section(f"Section {i}: {topic}", topic) for i in range(1, self.config.report_sections + 1)
+            )
+            return json.dumps({
+                "short_summary": f"A summary of the research on {topic}.",
+                "markdown_content": f"# {topic}\n\n{sections}",
+                "follow_up_questions": [f"What is next for {topic}?", f"Who are the main players in {topic}?"],
+            }), None
+        return " ".join(
+            f"{topic} fact {i}: detail {self.rng.randint(1, 999)} reported by source {self.rng.randint(1, 20)}."
+            for i in range(1, 10)
+        ), None
+
+    def _section(self, heading: str, topic: str) -> str:
+        index = re.search(r"\d+", heading)
+        index = index.group() if index else "1"
+        return f"## {heading}\n\n" + " ".join(
+            f"Finding {index}.{j} about {topic} with supporting detail number {self.rng.randint(1, 999)}."
+            for j in range(1, 9)
+        )
+
+    def _response(self, text: str | None, call: ResponseFunctionToolCall | None, input_text: str) -> Response:
+        if call is not None:
+            output = [call]
+            output_tokens = 10
+        else:
+            output = [ResponseOutputMessage(
+                id="msg_fake", type="message", role="assistant", status="completed",
+                content=[ResponseOutputText(type="output_text", text=text, annotations=[], logprobs=[])],
+            )]
+            output_tokens = len(text) // 4
+        input_tokens = len(input_text) // 4
+        return Response(
+            id=f"resp_{self.rng.getrandbits(32):08x}",
+            created_at=0,
+            model="fake-model",
+            object="response",
+            output=output,
+            tool_choice="none",
+            tools=[],
+            top_p=None,
+            parallel_tool_calls=False,
+            status="completed",
+            usage=ResponseUsage(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+                input_tokens_details=InputTokensDetails(cached_tokens=0, cache_write_tokens=0),
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+            ),
+        )
+
+    async def get_response(self, system_instructions, input, model_settings: ModelSettings, tools, output_schema,
+                           handoffs, tracing: ModelTracing, **kwargs) -> ModelResponse:
+        role = self._role(output_schema, tools)
+        await self._simulate_call(role)
+        input_text = _input_text(input)
+        text, call = self._output(role, input_text, handoffs)
+        response = self._response(text, call, input_text)
+        return ModelResponse(
+            output=response.output,
+            usage=Usage(
+                requests=1,
+                input_tokens=response.usage.input_tokens,
+                output_tokens=response.usage.output_tokens,
+                total_tokens=response.usage.total_tokens,
+            ),
+            response_id=response.id,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings: ModelSettings, tools, output_schema,
+                              handoffs, tracing: ModelTracing, **kwargs):
+        role = self._role(output_schema, tools)
+        input_text = _input_text(input)
+        text, call = self._output(role, input_text, handoffs)
+        response = self._response(text, call, input_text)
+        # Time to first token is a fraction of the call; the rest is spread over the deltas.
+        median = self.config.latency.get(role, 1.0) * self.config.latency_scale
+        total = self.rng.lognormvariate(0, self.config.latency_sigma) * median if median > 0 else 0.0
+        await asyncio.sleep(total * 0.1)
+        if self.rng.random() < self.config.failure_rate.get(role, 0.0):
+            raise FakeModelError(f"Simulated {role} model failure")
+        sequence_number = 0
+        if text is not None:
+            size = self.config.stream_chunk_chars
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            for chunk in chunks:
+                await asyncio.sleep(total * 0.9 / len(chunks))
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta", item_id="msg_fake", output_index=0, content_index=0,
+                    delta=chunk, logprobs=[], sequence_number=sequence_number,
+                )
+                sequence_number += 1
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=sequence_number)
+
+
+class FakeModelProvider(ModelProvider):
+
+    def __init__(self, config: FakeModelConfig | None = None):
+        self.config = config if config is not None else FakeModelConfig.from_env()
+        self.rng = random.Random(self.config.seed)
+        self.requested_models: list[str | None] = []   # Model names asked for, in order; the answers ignore them
+
+    def get_model(self, model_name: str | None) -> Model:
+        self.requested_models.append(model_name)
+        return FakeModel(self.config, self.rng)
+
+
+def fake_run_config(config: FakeModelConfig | None = None) -> RunConfig:
+    return RunConfig(model_provider=FakeModelProvider(config), tracing_disabled=True)
+
+
+def default_run_config() -> RunConfig | None:
+    """RunConfig for the backend selected by MODEL_BACKEND; None means the SDK's default OpenAI setup."""
+    if MODEL_BACKEND == "fake":
+        return fake_run_config()
+    return None
@@ -0,0 +1,73 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from config import load_env
+from planner_agent import WebSearchPlan
+from search_cache import normalize_query
+
+load_env()
+
+# Follow-up questions of each report to plan ahead in the background; 0 disables prefetching
+PREFETCH_FOLLOW_UPS = int(os.getenv('PREFETCH_FOLLOW_UPS', '0'))
+# Also run the planned searches, not only the planning
+PREFETCH_SEARCHES = os.getenv('PREFETCH_SEARCHES', 'true').lower() in ('1', 'true', 'yes')
+PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '900'))
+PREFETCH_MAX_ITEMS = int(os.getenv('PREFETCH_MAX_ITEMS', '256'))
+# Reports prefetching at the same time in the process; later reports skip prefetching
+PREFETCH_CONCURRENCY = int(os.getenv('PREFETCH_CONCURRENCY', '1'))
+# Search scheduler load ((active + waiting) / max concurrency) at or above which prefetching waits
+PREFETCH_BUSY_LOAD = float(os.getenv('PREFETCH_BUSY_LOAD', '0.5'))
+# Seconds prefetching waits for idle capacity before giving up
+PREFETCH_MAX_WAIT_SECONDS = float(os.getenv('PREFETCH_MAX_WAIT_SECONDS', '60'))
+
+
+@dataclass
+class PrefetchedResearch:
+    question: str
+    plan: WebSearchPlan
+    results: list[str]    # Results of the first len(results) searches of the plan
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class PrefetchCache:
+    """Short-lived in-memory cache of follow-up questions planned (and searched) ahead of time.
+
+    Entries are keyed by the normalized question and taken out when a run uses them.
+    """
+
+    def __init__(self, ttl: float = PREFETCH_TTL_SECONDS, max_items: int = PREFETCH_MAX_ITEMS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.active = 0   # Prefetches in progress
+        self._items: OrderedDict[str, PrefetchedResearch] = OrderedDict()
+
+    def _expired(self, item: PrefetchedResearch) -> bool:
+        return time.monotonic() - item.created_at > self.ttl
+
+    def has(self, question: str) -> bool:
+        item = self._items.get(normalize_query(question))
+        return item is not None and not self._expired(item)
+
+    def put(self, item: PrefetchedResearch) -> None:
+        key = normalize_query(item.question)
+        self._items[key] = item
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def take(self, *queries: str) -> PrefetchedResearch | None:
+        """Removes and returns the first unexpired entry for any of `queries`."""
+        for query in queries:
+            item = self._items.pop(normalize_query(query), None)
+            if item is not None and not self._expired(item):
+                return item
+        return None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Shared by every SearchManager in the process.
+prefetch_cache = PrefetchCache()
@@ -1,8 +1,15 @@
 import gradio as gr
-from dotenv import load_dotenv
+import os
+from config import load_env
 from utils.custom_css import custom_css
 
-load_dotenv(override=True)
+load_env()
+
+GRADIO_SERVER_PORT = int(os.getenv('GRADIO_SERVER_PORT', '7860'))
+GRADIO_INBROWSER = os.getenv('GRADIO_INBROWSER', 'true').lower() in ('1', 'true', 'yes')
+# Research runs the queue executes at once; further requests wait in the queue. Their searches
+# share the search scheduler's SEARCH_MAX_CONCURRENCY cap either way
+GRADIO_CONCURRENCY_LIMIT = int(os.getenv('GRADIO_CONCURRENCY_LIMIT', '8'))
 
 class GradioUI:
     def __init__(self):
@@ -10,7 +17,7 @@ class GradioUI:
         self.create_ui()
         
     def create_ui(self):
-        from main import main
+        from main import main, show_section
         
         with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue"), css=custom_css) as self.demo:
             with gr.Row(elem_id="header"):
@@ -23,24 +30,38 @@ class GradioUI:
                     query_input = gr.Textbox(label="Query", placeholder="Enter the topic you want to explore...", lines=1, autofocus=True)
                     with gr.Row(elem_id="controls"):
                         run_button = gr.Button("Run Workflow", variant="primary", size="lg")
+                        stop_button = gr.Button("Stop", variant="secondary", size="lg")
                 with gr.TabItem("Research Result"):
                     result_output = gr.Markdown(label="Research Result")
+                    # Long reports are shown one section at a time; the sections stay on the server.
+                    sections_state = gr.State([])
+                    section_selector = gr.Dropdown(label="Section", choices=[], interactive=True)
+                    section_output = gr.Markdown(label="Section")
             with gr.Row(elem_id="footer"):
                 gr.HTML("<p style='text-align:center;'>Built with ❤️ using Gradio | GuilleFerru 👨‍💻</p> ")   
 
-            run_button.click(
+            run_event = run_button.click(
                 fn=main,
                 inputs=query_input,
-                outputs=[progress_output, result_output],
+                outputs=[progress_output, result_output, sections_state, section_selector, section_output],
                 api_name="search",
-                queue=True 
+                queue=True,
+                concurrency_limit=GRADIO_CONCURRENCY_LIMIT,
+            )
+            # Cancelling the event closes the `main` generator, which cancels the research run.
+            stop_button.click(fn=None, cancels=[run_event])
+            section_selector.input(
+                fn=show_section,
+                inputs=[section_selector, sections_state],
+                outputs=section_output,
+                queue=False,
             )
     
-    def launch(self):
+    def launch(self, server_port: int = GRADIO_SERVER_PORT, inbrowser: bool = GRADIO_INBROWSER):
         if self.demo:
             self.demo.launch(
-                server_port=7860, 
+                server_port=server_port,
                 share=False,
-                inbrowser=True,
+                inbrowser=inbrowser,
             )
 
@@ -0,0 +1,145 @@
+"""
+One pooled HTTP client for every OpenAI call of the process.
+
+The agents SDK otherwise builds its own AsyncOpenAI client with default httpx settings. This
+module builds one AsyncOpenAI client on a shared httpx connection pool, with configurable
+limits, keep-alive, timeouts and optional HTTP/2, and installs it as the SDK's default client
+so all agents reuse warm connections instead of paying a TCP/TLS handshake per call.
+
+The pool is exported as metrics: connections by state (active/idle), new connections opened,
+requests sent and how long each request waited for a connection.
+
+The client is bound to the event loop it first runs on, so install it once per process in a
+process with one long-running loop (the Gradio app, the HTTP server, a batch run).
+"""
+import logging
+import os
+import time
+
+import httpx
+from agents import set_default_openai_client
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from config import load_env
+from metrics import Counter, Gauge, Histogram, MetricsRegistry, pipeline_metrics
+
+load_env()
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('HTTP_KEEPALIVE_EXPIRY_SECONDS', '60'))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', '10'))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv('HTTP_READ_TIMEOUT_SECONDS', '600'))
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv('HTTP_POOL_TIMEOUT_SECONDS', '30'))   # Wait for a free connection
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP2 = os.getenv('HTTP2', 'false').lower() in ('1', 'true', 'yes')   # Needs the h2 package (httpx[http2])
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class PoolMetrics:
+    """Connection pool statistics of the shared client."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.transports: list["PooledTransport"] = []
+        self.wait_seconds = registry.register(Histogram(
+            "deep_research_http_pool_wait_seconds", "Time a request waited for a pooled connection.", WAIT_BUCKETS))
+        self.connections_opened = registry.register(Counter(
+            "deep_research_http_connections_opened_total", "New connections opened (each one a TCP/TLS handshake)."))
+        self.requests = registry.register(Counter(
+            "deep_research_http_requests_total", "Requests sent through the shared pool."))
+        registry.register(Gauge(
+            "deep_research_http_connections", "Connections in the shared pool by state.", self.connection_states))
+
+    def connection_states(self) -> list[tuple[dict, float]]:
+        connections = [connection for transport in self.transports for connection in transport.connections()]
+        idle = sum(connection.is_idle() for connection in connections)
+        return [({"state": "active"}, len(connections) - idle), ({"state": "idle"}, idle)]
+
+    def observe_wait(self, seconds: float) -> None:
+        with self.registry.lock:
+            self.wait_seconds.observe(seconds)
+
+
+http_pool_metrics = PoolMetrics(pipeline_metrics.registry)
+
+
+class PooledTransport(httpx.AsyncHTTPTransport):
+    """AsyncHTTPTransport that records how long each request waits for a connection of its pool.
+
+    The wait ends when the pool hands out a connection: either a new one starts connecting or
+    a kept-alive one starts sending the request (reported through httpcore's trace extension).
+    """
+
+    def __init__(self, metrics: PoolMetrics = http_pool_metrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        metrics.transports.append(self)
+
+    def connections(self) -> list:
+        return list(self._pool.connections)   # httpx keeps its httpcore pool private
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        waiting = True
+        previous = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            nonlocal waiting
+            new_connection = event_name == "connection.connect_tcp.started"
+            if waiting and (new_connection or event_name.endswith(".send_request_headers.started")):
+                waiting = False
+                self.metrics.observe_wait(time.monotonic() - start)
+            if new_connection:
+                with self.metrics.registry.lock:
+                    self.metrics.connections_opened.inc()
+            if previous is not None:
+                await previous(event_name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        with self.metrics.registry.lock:
+            self.metrics.requests.inc()
+        return await super().handle_async_request(request)
+
+
+def build_http_client(http2: bool = HTTP2) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    try:
+        transport = PooledTransport(limits=limits, http2=http2)
+    except ImportError:
+        logger.warning("HTTP2 needs the h2 package (pip install 'httpx[http2]'); using HTTP/1.1")
+        transport = PooledTransport(limits=limits)
+    return DefaultAsyncHttpxClient(transport=transport, timeout=client_timeout())
+
+
+def client_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        HTTP_READ_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS, pool=HTTP_POOL_TIMEOUT_SECONDS,
+    )
+
+
+_shared_client: AsyncOpenAI | None = None
+
+
+def shared_openai_client() -> AsyncOpenAI:
+    """The process-wide AsyncOpenAI client on the pooled HTTP client, created on first use."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncOpenAI(
+            http_client=build_http_client(), timeout=client_timeout(), max_retries=HTTP_MAX_RETRIES,
+        )
+    return _shared_client
+
+
+def install_shared_client() -> AsyncOpenAI:
+    """Makes the shared client the default of every agent run that uses the SDK's OpenAI provider."""
+    client = shared_openai_client()
+    set_default_openai_client(client)
+    return client
@@ -1,88 +1,135 @@
 from search_manager import SearchManager
-from utils.markdown_formater import format_search_plan_as_markdown
-from dotenv import load_dotenv
+from session_registry import SessionRegistry
+from progress import REPORT, STORED_REPORT
+from utils.markdown_formater import format_partial_report, format_report_overview, split_sections
+from config import load_env
+import gradio as gr
 import asyncio
+import os
+
+load_env()
+
+# Push the report into the Research Result tab while the writer is still producing it
+STREAM_REPORT = os.getenv('STREAM_REPORT', 'true').lower() in ('1', 'true', 'yes')
+
+session_registry = SessionRegistry()
+
+
+def report_view(report, note: str = "") -> tuple:
+    """Outputs for the Research Result tab: overview, sections state, section picker and the first section.
+
+    Only the overview and the picked section are sent to the browser; the sections stay in the session state.
+    """
+    sections = split_sections(report.markdown_content)
+    choices = [(f"{i}. {title}", i - 1) for i, (title, _) in enumerate(sections, 1)]
+    return (
+        note + format_report_overview(report, sections),
+        sections,
+        gr.update(choices=choices, value=0 if sections else None),
+        sections[0][1] if sections else "",
+    )
+
+
+def show_section(index: int | None, sections: list[tuple[str, str]]) -> str:
+    if index is None or not sections or not 0 <= index < len(sections):
+        return ""
+    return sections[index][1]
+
+
+async def main(query: str, request: gr.Request = None):
+
+    # Each browser session gets its own SearchManager, so concurrent users never share refinement state.
+    session_id = request.session_hash if request is not None and request.session_hash else "default"
+
+    # Outputs: progress log, result overview, report sections (state), section picker, picked section
+    unchanged = (gr.update(), gr.update(), gr.update())
+    cleared = ([], gr.update(choices=[], value=None), "")
+
+    def stored_report_view(stored) -> tuple:
+        note = (f"*Stored report for a similar query: \"{stored.refined_query}\". "
+                f"A fresh report will replace it when ready.*\n\n")
+        return report_view(stored.report, note)
+
+    # A new request while this session's run is still going replaces that run: cancel it and start over.
+    session = session_registry.get(session_id)
+    if session is not None and session.task is not None and not session.task.done():
+        session_registry.remove(session_id)
+        session = None
+
+    # If this session has no search in progress, start a new one with a fresh progress log.
+    # Otherwise, reuse the session's manager and keep appending to its log.
+    if session is None:
+        session = session_registry.create(session_id, SearchManager(stream_report=STREAM_REPORT))
+        session.progress_log.append("Starting research process...")
+        yield session.progress_log.render(), None, *cleared
+
+    # Subscribe before starting the run so no event is missed; the subscription ends when the run does.
+    events = session.manager.events.subscribe()
+    session.active = True
+    search_task = asyncio.create_task(session.manager.run(query))
+    session.task = search_task
+    search_task.add_done_callback(lambda _: events.close())
+
+    try:
+        # Progress events are appended to the session's log, partial reports replace the Research Result tab;
+        # the other output is left untouched.
+        async for event in events:
+            if event.kind == REPORT:
+                yield gr.update(), format_partial_report(event.data), *unchanged
+            elif event.kind == STORED_REPORT:
+                session.progress_log.append_event(event)
+                yield session.progress_log.render(), *stored_report_view(event.data)
+            else:
+                session.progress_log.append_event(event)
+                yield session.progress_log.render(), gr.update(), *unchanged
 
-load_dotenv(override=True)
-
-global_search_manager = None
-global_progress_messages = []
-
-async def main(query: str):
-    
-    global global_search_manager, global_progress_messages
-
-
-    progress_queue = asyncio.Queue()
-
-    def format_progress(messages: list[str]) -> str:
-        """Formats a list of messages as markdown."""
-        formatted = "### Progress Log:\n\n"
-        for msg in messages:
-            formatted += f"- {msg}\n"
-        return formatted
-
-    # If no search is active, start a new search session: reset the progress log and create a SearchManager.
-    # Otherwise, reuse the existing manager and update its progress callback to write to our new queue.
-    if global_search_manager is None:
-        
-        global_progress_messages = ["Starting research process..."]
-        async def update_progress(message: str) -> None:
-            await progress_queue.put(message)
-        global_search_manager = SearchManager(progress_callback=update_progress)
-        
-    else:
-        
-        async def update_progress(message: str) -> None:
-            await progress_queue.put(message)
-        global_search_manager.progress_callback = update_progress
-
-    search_task = asyncio.create_task(global_search_manager.run(query))
-
-    # If this is the first call in a new session, yield the initial log.
-    if len(global_progress_messages) == 1:
-        yield format_progress(global_progress_messages), None
-
-    # Drain the queue as messages arrive. Each message is appended to the persistent log and emitted to the UI.
-    while not search_task.done():
-        try:
-            message = await asyncio.wait_for(progress_queue.get(), timeout=5.0)
-            global_progress_messages.append(message)
-            yield format_progress(global_progress_messages), None
-        except asyncio.TimeoutError:
-            # Avoid blocking the event loop; yield control briefly.
-            await asyncio.sleep(0.1)
-
-    result = await search_task
-
-    # Append any remaining messages to the progress log.
-    while not progress_queue.empty():
         try:
-            msg = progress_queue.get_nowait()
-            global_progress_messages.append(msg)
-        except Exception:
-            break
+            result = await search_task
+        except asyncio.CancelledError:
+            if not search_task.cancelled() or asyncio.current_task().cancelling():
+                raise
+            # Replaced by a newer request of the same session.
+            session.progress_log.append("**Research cancelled.**")
+            yield session.progress_log.render(), None, *unchanged
+            return
+        except Exception as e:
+            if session.manager.resume_trace_id is None:
+                # Nothing to resume: drop the session so its stale refinement state doesn't hijack the next query.
+                session_registry.remove(session_id, session)
+                raise
+            # The session keeps the failed run's checkpoint; the same query again resumes it.
+            session.progress_log.append(
+                f"**Research failed ({e}). Submit the same query again to resume from the last completed step.**"
+            )
+            yield session.progress_log.render(), None, *unchanged
+            return
+    finally:
+        session.active = False
+        if not search_task.done():
+            # The request was abandoned (client gone or stopped): cancel the run and free the session.
+            session_registry.remove(session_id, session)
 
     # If refinement is not complete (is_final=False), ask the user for more information and keep the search manager alive. Do not reset state.
     if isinstance(result, dict) and not result.get("is_final", True):
-        global_progress_messages.append(
+        session.progress_log.append(
             "**Awaiting additional information from user based on the above question.**"
         )
-        yield format_progress(global_progress_messages), None
+        yield session.progress_log.render(), None, *unchanged
         return
 
-    # Otherwise, the search is complete. Format the report and clean up
-    formatted_result = format_search_plan_as_markdown(result)
-    global_progress_messages.append("Research complete")
-    global_progress_messages.append("**Check Research Result Tab!!!!**")
-    yield format_progress(global_progress_messages), formatted_result
+    # Otherwise, the search is complete. Show the report overview and its first section, and clean up
+    session.progress_log.append("Research complete")
+    session.progress_log.append("**Check Research Result Tab!!!!**")
+    yield session.progress_log.render(), *report_view(result)
 
-    global_search_manager = None
-    global_progress_messages = []
+    session_registry.remove(session_id, session)
 
 if __name__ == "__main__":
     from gradio_ui import GradioUI
-    
+    from metrics import METRICS_PORT, start_metrics_server
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
     gradio = GradioUI()
     gradio.launch()
-
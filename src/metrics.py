@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))   # 0 disables the metrics endpoint
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with labels."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', _format_number(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose labelled values are read from `callback` at render time."""
+
+    def __init__(self, name: str, help: str, callback):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(tuple(sorted(labels.items())))} {_format_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+        self.lock = threading.Lock()   # The HTTP endpoint renders from its own thread
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render_prometheus(self) -> str:
+        with self.lock:
+            lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class AgentCall:
+    agent: str
+    stage: str
+    queue_wait: float = 0.0       # Seconds between the request and the start of the call
+    wall_time: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    status: str = "ok"
+    model: str | None = None      # Model chosen by the router, None when the agent's own model is used
+    started_at: float = field(default_factory=time.monotonic)
+
+    def set_usage(self, result) -> None:
+        """Reads token usage from a finished (or fully streamed) RunResult."""
+        usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+        if usage is not None:
+            self.input_tokens = usage.input_tokens
+            self.output_tokens = usage.output_tokens
+
+
+class PipelineMetrics:
+    """Per-agent timing and token usage, exported as histograms and summarized per trace id."""
+
+    def __init__(self, registry: MetricsRegistry | None = None, max_traces: int = 1000):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.max_traces = max_traces
+        self._traces: OrderedDict[str, list[AgentCall]] = OrderedDict()
+        self.run_seconds = self.registry.register(Histogram(
+            "deep_research_agent_run_seconds", "Wall time of each agent run.", LATENCY_BUCKETS))
+        self.queue_wait_seconds = self.registry.register(Histogram(
+            "deep_research_agent_queue_wait_seconds", "Time an agent run waited before starting.", LATENCY_BUCKETS))
+        self.input_tokens = self.registry.register(Histogram(
+            "deep_research_agent_input_tokens", "Input tokens per agent run.", TOKEN_BUCKETS))
+        self.output_tokens = self.registry.register(Histogram(
+            "deep_research_agent_output_tokens", "Output tokens per agent run.", TOKEN_BUCKETS))
+        self.runs_total = self.registry.register(Counter(
+            "deep_research_agent_runs_total", "Agent runs by outcome."))
+
+    def record(self, trace_id: str | None, call: AgentCall) -> None:
+        labels = {"agent": call.agent, "stage": call.stage}
+        with self.registry.lock:
+            self.run_seconds.observe(call.wall_time, **labels)
+            self.queue_wait_seconds.observe(call.queue_wait, **labels)
+            if call.status == "ok":
+                self.input_tokens.observe(call.input_tokens, **labels)
+                self.output_tokens.observe(call.output_tokens, **labels)
+            self.runs_total.inc(status=call.status, **labels)
+        if trace_id is not None:
+            self._traces.setdefault(trace_id, []).append(call)
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def calls(self, trace_id: str) -> list[AgentCall]:
+        return list(self._traces.get(trace_id, []))
+
+    def tokens(self, trace_id: str) -> int:
+        return sum(call.input_tokens + call.output_tokens for call in self._traces.get(trace_id, []))
+
+    def summarize(self, trace_id: str) -> list[str]:
+        """One line per stage with call count, summed wall time, max queue wait and tokens."""
+        stages: dict[str, list[AgentCall]] = {}
+        for call in self._traces.get(trace_id, []):
+            stages.setdefault(call.stage, []).append(call)
+        lines = []
+        for stage, calls in stages.items():
+            failed = sum(call.status != "ok" for call in calls)
+            lines.append(
+                f"{stage}: {len(calls)} call(s){f' ({failed} failed)' if failed else ''}, "
+                f"{sum(call.wall_time for call in calls):.1f}s agent time, "
+                f"max queue wait {max(call.queue_wait for call in calls):.1f}s, "
+                f"{sum(call.input_tokens for call in calls)} in / {sum(call.output_tokens for call in calls)} out tokens"
+            )
+        return lines
+
+    def forget(self, trace_id: str) -> None:
+        self._traces.pop(trace_id, None)
+
+
+# Shared by every SearchManager in the process.
+pipeline_metrics = PipelineMetrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = pipeline_metrics.registry
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, registry: MetricsRegistry = pipeline_metrics.registry) -> ThreadingHTTPServer:
+    """Serves GET /metrics in Prometheus text format from a daemon thread."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer(("0.0.0.0", port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
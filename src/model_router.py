@@ -0,0 +1,133 @@
+import os
+import time
+from dataclasses import dataclass
+
+from config import load_env
+from metrics import Gauge, MetricsRegistry, pipeline_metrics
+
+load_env()
+
+FAST = "fast"
+STANDARD = "standard"
+QUALITY = "quality"
+
+# Stages of the pipeline and the tier each runs on by default; the fan-out stages use the fast tier
+DEFAULT_STAGE_TIERS = {
+    "refinement": STANDARD,   # Refinement agent and the refactor agent it hands off to
+    "planning": STANDARD,
+    "search": FAST,
+    "coverage": FAST,
+    "writing": QUALITY,
+}
+# Seconds of average latency above which a model of the tier counts as degraded
+DEFAULT_LATENCY_BUDGETS = {FAST: 30.0, STANDARD: 60.0, QUALITY: 300.0}
+
+MODEL_MAX_ERROR_RATE = float(os.getenv('MODEL_MAX_ERROR_RATE', '0.5'))
+MODEL_EWMA_ALPHA = float(os.getenv('MODEL_EWMA_ALPHA', '0.3'))
+MODEL_PROBE_SECONDS = float(os.getenv('MODEL_PROBE_SECONDS', '60'))
+
+
+def _models(value: str | None) -> list[str]:
+    return [model.strip() for model in (value or "").split(",") if model.strip()]
+
+
+def tiers_from_env() -> dict[str, list[str]]:
+    """Models of each tier, preferred first, from MODEL_TIER_<TIER>; every tier defaults to AI_MODEL."""
+    default = _models(os.getenv('AI_MODEL', ''))
+    return {tier: _models(os.getenv(f'MODEL_TIER_{tier.upper()}')) or default for tier in (FAST, STANDARD, QUALITY)}
+
+
+def stage_models_from_env() -> dict[str, list[str]]:
+    """Models pinned for a stage with <STAGE>_MODEL, or taken from its tier set with <STAGE>_MODEL_TIER."""
+    tiers = tiers_from_env()
+    models = {}
+    for stage, tier in DEFAULT_STAGE_TIERS.items():
+        tier = os.getenv(f'{stage.upper()}_MODEL_TIER', tier).lower()
+        models[stage] = _models(os.getenv(f'{stage.upper()}_MODEL')) or tiers.get(tier, [])
+    return models
+
+
+def stage_budgets_from_env() -> dict[str, float]:
+    budgets = {}
+    for stage, tier in DEFAULT_STAGE_TIERS.items():
+        tier = os.getenv(f'{stage.upper()}_MODEL_TIER', tier).lower()
+        default = os.getenv(f'MODEL_TIER_{tier.upper()}_LATENCY_SECONDS', str(DEFAULT_LATENCY_BUDGETS.get(tier, 60.0)))
+        budgets[stage] = float(default)
+    return budgets
+
+
+@dataclass
+class ModelStats:
+    latency: float | None = None   # Moving average of the wall time of successful calls
+    error_rate: float = 0.0        # Moving average of failures (1) and successes (0)
+    calls: int = 0
+    updated_at: float = 0.0
+
+
+class ModelRouter:
+    """Chooses the model for each agent run from the candidates of its stage.
+
+    The first candidate that is not degraded wins. A model is degraded while its moving error
+    rate is above `max_error_rate` or its moving latency is above the stage's latency budget;
+    a degraded model gets a probe call again once it has not been used for `probe_seconds`, so
+    it recovers when the provider does. If every candidate is degraded, the one with the lowest
+    expected latency (latency / success rate) is used.
+    """
+
+    def __init__(self, stage_models: dict[str, list[str]] | None = None, latency_budgets: dict[str, float] | None = None,
+                 max_error_rate: float = MODEL_MAX_ERROR_RATE, alpha: float = MODEL_EWMA_ALPHA,
+                 probe_seconds: float = MODEL_PROBE_SECONDS):
+        self.stage_models = stage_models if stage_models is not None else stage_models_from_env()
+        self.latency_budgets = latency_budgets if latency_budgets is not None else stage_budgets_from_env()
+        self.max_error_rate = max_error_rate
+        self.alpha = alpha
+        self.probe_seconds = probe_seconds
+        self.stats: dict[str, ModelStats] = {}
+
+    def degraded(self, model: str, stage: str, now: float) -> bool:
+        stats = self.stats.get(model)
+        if stats is None or now - stats.updated_at >= self.probe_seconds:
+            return False
+        if stats.error_rate > self.max_error_rate:
+            return True
+        budget = self.latency_budgets.get(stage)
+        return bool(budget) and stats.latency is not None and stats.latency > budget
+
+    def choose(self, stage: str) -> str | None:
+        """The model for the next run of `stage`, or None to keep the agent's own model."""
+        candidates = self.stage_models.get(stage) or []
+        if not candidates:
+            return None
+        now = time.monotonic()
+        for model in candidates:
+            if not self.degraded(model, stage, now):
+                return model
+
+        def expected_latency(model: str) -> float:
+            stats = self.stats[model]
+            return (stats.latency or 0.0) / max(1e-3, 1 - stats.error_rate)
+
+        return min(candidates, key=expected_latency)
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        stats = self.stats.setdefault(model, ModelStats())
+        stats.calls += 1
+        stats.updated_at = time.monotonic()
+        stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+        if ok:
+            stats.latency = seconds if stats.latency is None else stats.latency + self.alpha * (seconds - stats.latency)
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        """Exports the moving latency and error rate of each model as gauges."""
+        registry.register(Gauge(
+            "deep_research_model_latency_seconds", "Moving average latency of successful calls per model.",
+            lambda: [({"model": model}, stats.latency) for model, stats in list(self.stats.items())
+                     if stats.latency is not None]))
+        registry.register(Gauge(
+            "deep_research_model_error_rate", "Moving average error rate per model.",
+            lambda: [({"model": model}, stats.error_rate) for model, stats in list(self.stats.items())]))
+
+
+# Shared by every SearchManager in the process.
+model_router = ModelRouter()
+model_router.register_metrics(pipeline_metrics.registry)
@@ -1,16 +1,17 @@
 import os
 from pydantic import BaseModel, Field
 from agents import Agent
-from dotenv import load_dotenv
+from config import load_env
 
 QTY_SEARCHES = 3
 
-load_dotenv(override=True)
+load_env()
 model = os.getenv('AI_MODEL', '')
 
 
 INSTRUCTION = f"You are a helpful research assistant. Given a query, come up with a set of web searches \
-to perform to best answer the query. Output {QTY_SEARCHES} terms to query for."
+to perform to best answer the query. Output at most the maximum number of searches given with the query \
+({QTY_SEARCHES} if none is given): use fewer terms for a narrow, specific query and the full amount for a broad one."
 
 class WebSearchItem(BaseModel):
     reason: str = Field(description="A reason for the search term, explaining why it is relevant to the query.")
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+# Event kinds published by SearchManager
+LOG = "log"
+STAGE_START = "stage_start"
+STAGE_END = "stage_end"
+SEARCH = "search"
+ERROR = "error"
+REPORT = "report"
+STORED_REPORT = "stored_report"
+
+
+@dataclass
+class ProgressEvent:
+    kind: str
+    message: str = ""
+    stage: str | None = None
+    index: int | None = None         # For SEARCH events: 1-based position of the search...
+    total: int | None = None         # ...out of this many planned searches
+    data: Any = None                 # REPORT: the partial report markdown; STORED_REPORT: the StoredReport
+    timestamp: float = field(default_factory=time.time)
+
+
+class Subscription:
+    """Async iterator over the events published after `ProgressBus.subscribe` was called.
+
+    Iteration ends when the subscription (or its bus) is closed.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, bus: "ProgressBus", max_queue: int):
+        self._bus = bus
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def put(self, event: ProgressEvent) -> None:
+        if self.closed:
+            return
+        if self._queue.full():
+            # A slow subscriber loses its oldest events instead of blocking the pipeline.
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._bus.unsubscribe(self)
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(self._CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self._queue.get()
+        if event is self._CLOSED:
+            raise StopAsyncIteration
+        return event
+
+    def drain(self) -> list[ProgressEvent]:
+        """Returns the events already queued without waiting."""
+        events = []
+        while not self._queue.empty():
+            event = self._queue.get_nowait()
+            if event is not self._CLOSED:
+                events.append(event)
+        return events
+
+
+class ProgressBus:
+    """Fan-out of progress events to any number of subscribers."""
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: list[Subscription] = []
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, self.max_queue)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def publish(self, event: ProgressEvent) -> None:
+        for subscription in list(self._subscribers):
+            subscription.put(event)
+
+    def close(self) -> None:
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+
+def format_event(event: ProgressEvent) -> str:
+    """Formats a single event as one markdown list item."""
+    if event.kind == ERROR:
+        return f"- **Error:** {event.message}\n"
+    if event.kind == SEARCH and event.index is not None:
+        position = f"{event.index}/{event.total}" if event.total is not None else f"{event.index}"
+        return f"- [{position}] {event.message}\n"
+    return f"- {event.message}\n"
+
+
+class ProgressLog:
+    """Append-only markdown rendering of the progress log.
+
+    Each message is formatted once when it is appended; the log keeps at most `max_lines`
+    lines so the rendered text sent to the UI stays bounded for long runs.
+    """
+
+    def __init__(self, title: str = "### Progress Log:", max_lines: int = 200):
+        self.header = f"{title}\n\n"
+        self._lines: deque[str] = deque(maxlen=max_lines)
+        self._body = ""
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def append(self, message: str) -> None:
+        self.append_line(f"- {message}\n")
+
+    def append_event(self, event: ProgressEvent) -> None:
+        self.append_line(format_event(event))
+
+    def append_line(self, line: str) -> None:
+        if len(self._lines) == self._lines.maxlen:
+            self._lines.append(line)
+            self._body = "".join(self._lines)
+        else:
+            self._lines.append(line)
+            self._body += line
+
+    def render(self) -> str:
+        return self.header + self._body
@@ -1,9 +1,9 @@
 from pydantic import BaseModel, Field
 from agents import Agent
 import os
-from dotenv import load_dotenv
+from config import load_env
 
-load_dotenv(override=True)
+load_env()
 model = os.getenv('AI_MODEL', '')
 
 class RefinementQuestion(BaseModel):
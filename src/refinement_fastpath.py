@@ -0,0 +1,88 @@
+import os
+import re
+from collections import OrderedDict
+from search_cache import normalize_query
+
+REFINEMENT_FAST_PATH = os.getenv('REFINEMENT_FAST_PATH', 'true').lower() in ('1', 'true', 'yes')
+REFINEMENT_MEMO_ITEMS = int(os.getenv('REFINEMENT_MEMO_ITEMS', '1024'))
+SPECIFIC_QUERY_SCORE = int(os.getenv('SPECIFIC_QUERY_SCORE', '4'))
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "about", "is", "are", "was", "were",
+    "what", "which", "who", "how", "why", "when", "where", "do", "does", "did", "i", "me", "my", "we", "you",
+    "it", "its", "this", "that", "these", "those", "be", "can", "should", "would", "tell", "give", "show",
+    "el", "la", "los", "las", "de", "del", "y", "o", "en", "para", "con", "sobre", "un", "una", "que", "es",
+}
+
+# Words that narrow the scope of a query: time frames, comparisons, audiences, places, formats
+CONSTRAINT_PATTERNS = [
+    r"\b(since|before|after|between|during|until|from)\b",
+    r"\b(19|20)\d{2}\b",
+    r"\b(last|past|next|this)\s+(year|month|week|decade|quarter)\b",
+    r"\b(vs\.?|versus|compared?\s+(to|with)|comparison|difference between)\b",
+    r"\b(for|in|within)\s+(beginners|experts|enterprises?|startups?|small businesses|students|production|europe|"
+    r"asia|africa|latin america|the (us|uk|eu))\b",
+    r"\b(impact|effect|cost|price|performance|benchmark|regulation|market share|adoption|risk)s?\b",
+    r"\b(desde|entre|durante|comparad[oa]|versus|impacto|costo|precio|rendimiento)\b",
+]
+
+
+def content_words(query: str) -> list[str]:
+    return [word for word in re.findall(r"\w+", query.lower()) if word not in STOPWORDS]
+
+
+def specificity(query: str) -> tuple[int, list[str]]:
+    """Scores how specific a query is from cheap local signals; returns the score and the reasons."""
+    words = content_words(query)
+    score = 0
+    reasons = []
+    if len(words) >= 6:
+        score += 1
+        reasons.append(f"{len(words)} content words")
+    if len(words) >= 12:
+        score += 1
+    # Named entities: capitalised words after the first one, acronyms and version numbers
+    tokens = query.split()
+    entities = [token for token in tokens[1:] if re.match(r"^[A-Z][\w.+#-]*$", token)]
+    entities += [token for token in tokens if re.match(r"^[A-Z]{2,}\d*$|^\w+\d+(\.\d+)*$|^v?\d+(\.\d+)+$", token)]
+    if entities:
+        score += min(2, len(set(entities)))
+        reasons.append(f"entities: {', '.join(sorted(set(entities))[:3])}")
+    constraints = [pattern for pattern in CONSTRAINT_PATTERNS if re.search(pattern, query, re.IGNORECASE)]
+    if constraints:
+        score += min(2, len(constraints))
+        reasons.append(f"{len(constraints)} constraint(s)")
+    return score, reasons
+
+
+def is_specific_query(query: str, threshold: int = SPECIFIC_QUERY_SCORE) -> bool:
+    """True when a query is detailed enough to skip the refinement agents."""
+    if len(content_words(query)) < 3:
+        return False
+    return specificity(query)[0] >= threshold
+
+
+class RefinementMemo:
+    """LRU memo of refinement contexts (original query plus any Q/A pairs) to their refined queries."""
+
+    def __init__(self, max_items: int = REFINEMENT_MEMO_ITEMS):
+        self.max_items = max_items
+        self._items: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, context: str) -> str | None:
+        key = normalize_query(context)
+        refined = self._items.get(key)
+        if refined is not None:
+            self._items.move_to_end(key)
+        return refined
+
+    def set(self, context: str, refined_query: str) -> None:
+        key = normalize_query(context)
+        self._items[key] = refined_query
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+# Shared by every SearchManager in the process.
+refinement_memo = RefinementMemo()
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from planner_agent import WebSearchPlan
+from writer_agent import ResearchReport
+
+REPORT_STORE_PATH = os.getenv('REPORT_STORE_PATH', '.cache/reports.sqlite3')
+# What to do when a refined query closely matches a stored one: "offer" shows the stored report while a
+# fresh one is written, "serve" returns it without running the pipeline, "off" never looks
+REPORT_REUSE = os.getenv('REPORT_REUSE', 'offer').lower()
+REPORT_MATCH_THRESHOLD = float(os.getenv('REPORT_MATCH_THRESHOLD', '0.85'))   # Cosine similarity of the queries
+REPORT_MAX_AGE_SECONDS = float(os.getenv('REPORT_MAX_AGE_SECONDS', '604800'))
+REPORT_INDEX_ITEMS = int(os.getenv('REPORT_INDEX_ITEMS', '2000'))            # Most recent reports in the vector index
+
+VECTOR_DIMENSIONS = 4096
+
+
+@dataclass
+class StoredReport:
+    id: int
+    query: str
+    refined_query: str
+    plan: WebSearchPlan
+    search_results: list[str]
+    report: ResearchReport
+    created_at: float
+
+
+def terms(text: str) -> list[str]:
+    """Lowercase words and word bigrams, the features of the vector index."""
+    words = re.findall(r"\w+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashedTfidfIndex:
+    """In-memory vector index of short texts using hashed TF-IDF features and cosine similarity.
+
+    Features are hashed into a fixed number of dimensions, so no vocabulary has to be kept;
+    IDF weights come from the texts currently in the index. Texts are kept as sparse hashed
+    vectors and scored sparsely, so a query costs time in the number of stored terms, not in
+    texts x dimensions, and adding a text only appends its terms.
+    """
+
+    def __init__(self, dimensions: int = VECTOR_DIMENSIONS, max_items: int = REPORT_INDEX_ITEMS):
+        self.dimensions = dimensions
+        self.max_items = max_items
+        self.ids: list[int] = []
+        self._rows: list[tuple[np.ndarray, np.ndarray]] = []     # (dimensions, log term frequencies) per text
+        self._document_frequency = np.zeros(dimensions, dtype=np.int64)
+        self._flat: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None   # Row, dimension, value of every term
+
+    def features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """The sparse hashed vector of a text: the dimensions it uses and their sublinear term frequencies."""
+        dimensions, counts = np.unique(
+            np.array([zlib.crc32(term.encode()) % self.dimensions for term in terms(text)], dtype=np.int64),
+            return_counts=True,
+        )
+        return dimensions, np.log1p(counts).astype(np.float32)
+
+    def vector(self, text: str) -> np.ndarray:
+        row = np.zeros(self.dimensions, dtype=np.float32)
+        dimensions, values = self.features(text)
+        row[dimensions] = values
+        return row
+
+    def add(self, id: int, text: str) -> None:
+        row = self.features(text)
+        self.ids.append(id)
+        self._rows.append(row)
+        self._document_frequency[row[0]] += 1
+        if len(self.ids) > self.max_items:
+            self._document_frequency[self._rows[0][0]] -= 1
+            del self.ids[0], self._rows[0]
+        self._flat = None
+
+    def _terms(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Concatenating the short sparse rows is cheap; it is redone on the first query after an add.
+        if self._flat is None:
+            self._flat = (
+                np.repeat(np.arange(len(self._rows)), [len(dimensions) for dimensions, _ in self._rows]),
+                np.concatenate([dimensions for dimensions, _ in self._rows]),
+                np.concatenate([values for _, values in self._rows]),
+            )
+        return self._flat
+
+    def query(self, text: str, limit: int = 5) -> list[tuple[int, float]]:
+        """Returns up to `limit` (id, cosine similarity) pairs, most similar first."""
+        if not self.ids:
+            return []
+        idf = (np.log((1 + len(self.ids)) / (1 + self._document_frequency)) + 1).astype(np.float32)
+        rows, dimensions, values = self._terms()
+        weighted = values * idf[dimensions]
+        norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=len(self.ids)))
+        vector = self.vector(text) * idf
+        norms *= np.linalg.norm(vector)
+        dots = np.bincount(rows, weights=weighted * vector[dimensions], minlength=len(self.ids))
+        scores = np.divide(dots, norms, out=np.zeros(len(self.ids), dtype=np.float64), where=norms > 0)
+        best = np.lexsort((-np.arange(len(self.ids)), -scores))[:limit]   # Newer first on ties
+        return [(self.ids[i], float(scores[i])) for i in best]
+
+
+class ReportStore:
+    """Persistent store of finished research runs: refined query, plan, search summaries and report.
+
+    Reports can be looked up by full-text search (SQLite FTS5) or by near-duplicate refined
+    query (hashed TF-IDF vectors). Pass `path=None` to keep the store in memory only.
+    Methods are thread-safe, so they can be called through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str | None = REPORT_STORE_PATH, index: HashedTfidfIndex | None = None):
+        self.path = path
+        self.index = index if index is not None else HashedTfidfIndex()
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.RLock()   # One connection shared by the worker threads
+
+    def _connect(self) -> sqlite3.Connection:
+        # The database is opened on first use so importing this module has no side effects.
+        if self._db is None:
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "id INTEGER PRIMARY KEY, query TEXT NOT NULL, refined_query TEXT NOT NULL, plan TEXT NOT NULL, "
+                "search_results TEXT NOT NULL, report TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(refined_query, short_summary, markdown_content)"
+            )
+            self._db.commit()
+            if not self.index.ids:
+                rows = self._db.execute(
+                    "SELECT id, refined_query FROM reports ORDER BY id DESC LIMIT ?", (self.index.max_items,)
+                ).fetchall()
+                for id, refined_query in reversed(rows):
+                    self.index.add(id, refined_query)
+        return self._db
+
+    def save(self, query: str, refined_query: str, plan: WebSearchPlan, search_results: list[str],
+             report: ResearchReport) -> int:
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute(
+                "INSERT INTO reports (query, refined_query, plan, search_results, report, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, refined_query, plan.model_dump_json(), json.dumps(search_results), report.model_dump_json(),
+                 time.time()),
+            )
+            db.execute(
+                "INSERT INTO reports_fts (rowid, refined_query, short_summary, markdown_content) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, refined_query, report.short_summary, report.markdown_content),
+            )
+            db.commit()
+            self.index.add(cursor.lastrowid, refined_query)
+            return cursor.lastrowid
+
+    def get(self, id: int) -> StoredReport | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, query, refined_query, plan, search_results, report, created_at FROM reports WHERE id = ?", (id,)
+            ).fetchone()
+            if row is None:
+                return None
+            id, query, refined_query, plan, search_results, report, created_at = row
+            return StoredReport(
+                id=id,
+                query=query,
+                refined_query=refined_query,
+                plan=WebSearchPlan.model_validate_json(plan),
+                search_results=json.loads(search_results),
+                report=ResearchReport.model_validate_json(report),
+                created_at=created_at,
+            )
+
+    def search(self, text: str, limit: int = 10) -> list[StoredReport]:
+        """Full-text search over the refined queries and reports, best matches first."""
+        with self._lock:
+            words = re.findall(r"\w+", text)
+            if not words:
+                return []
+            # Quote every word so user input cannot be read as FTS5 query syntax.
+            match = " OR ".join(f'"{word}"' for word in words)
+            rows = self._connect().execute(
+                "SELECT rowid FROM reports_fts WHERE reports_fts MATCH ? ORDER BY bm25(reports_fts) LIMIT ?", (match, limit)
+            ).fetchall()
+            return [report for (id,) in rows if (report := self.get(id)) is not None]
+
+    def find_similar(self, refined_query: str, threshold: float = REPORT_MATCH_THRESHOLD,
+                     max_age_seconds: float = REPORT_MAX_AGE_SECONDS) -> tuple[StoredReport, float] | None:
+        """The most similar recent report whose refined query scores at least `threshold`, with its score."""
+        with self._lock:
+            self._connect()
+            for id, score in self.index.query(refined_query):
+                if score < threshold:
+                    break
+                stored = self.get(id)
+                if stored is not None and time.time() - stored.created_at <= max_age_seconds:
+                    return stored, score
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Shared by every SearchManager in the process.
+report_store = ReportStore()
@@ -0,0 +1,40 @@
+import os
+import time
+from dataclasses import dataclass, field
+from planner_agent import QTY_SEARCHES
+
+RESEARCH_MAX_SECONDS = float(os.getenv('RESEARCH_MAX_SECONDS', '300'))
+RESEARCH_MAX_TOKENS = int(os.getenv('RESEARCH_MAX_TOKENS', '200000'))
+RESEARCH_MAX_SEARCHES = int(os.getenv('RESEARCH_MAX_SEARCHES', '8'))
+RESEARCH_MAX_ROUNDS = int(os.getenv('RESEARCH_MAX_ROUNDS', '0'))          # Follow-up rounds, 0 = single wave
+RESEARCH_MIN_NOVELTY = float(os.getenv('RESEARCH_MIN_NOVELTY', '0.2'))
+
+
+@dataclass
+class ResearchBudget:
+    """Limits for one research run; the run stops adding follow-up searches when any is reached."""
+    initial_searches: int = QTY_SEARCHES        # Upper bound for the first wave of searches
+    max_searches: int = RESEARCH_MAX_SEARCHES   # Total searches, first wave included
+    max_rounds: int = RESEARCH_MAX_ROUNDS       # Follow-up rounds after the first wave
+    max_seconds: float = RESEARCH_MAX_SECONDS   # Wall-clock time from the end of refinement
+    max_tokens: int = RESEARCH_MAX_TOKENS       # Input + output tokens of every agent run in the trace
+    min_novelty: float = RESEARCH_MIN_NOVELTY   # Stop when a round adds less than this share of new sentences
+    started_at: float = field(default_factory=time.monotonic)
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def exhausted(self, searches: int, tokens: int, rounds: int) -> str | None:
+        """Returns why the budget is spent, or None if more research is allowed."""
+        if rounds >= self.max_rounds:
+            return f"reached {self.max_rounds} follow-up round(s)"
+        if searches >= self.max_searches:
+            return f"reached {self.max_searches} searches"
+        if tokens >= self.max_tokens:
+            return f"used {tokens} of {self.max_tokens} tokens"
+        if self.elapsed() >= self.max_seconds:
+            return f"used {self.elapsed():.0f}s of {self.max_seconds:.0f}s"
+        return None
@@ -0,0 +1,135 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH', '.cache/search_cache.sqlite3')
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', '86400'))
+SEARCH_CACHE_MEMORY_ITEMS = int(os.getenv('SEARCH_CACHE_MEMORY_ITEMS', '512'))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different queries share a key."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def __str__(self) -> str:
+        return f"hits={self.hits} (memory={self.memory_hits}, disk={self.disk_hits}) misses={self.misses}"
+
+
+class SearchCache:
+    """Two-level cache for search summaries.
+
+    Hot entries live in an in-memory LRU; every entry is also written to a SQLite file
+    with its own expiry so results survive restarts and are shared between sessions.
+    Pass `path=None` to keep the cache in memory only. Writes are not synced to disk one
+    by one (WAL with synchronous=NORMAL), and methods are thread-safe, so they can be
+    called through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str | None = SEARCH_CACHE_PATH, ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+                 memory_items: int = SEARCH_CACHE_MEMORY_ITEMS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_items = memory_items
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.RLock()   # One connection shared by the worker threads
+
+    def _connect(self) -> sqlite3.Connection | None:
+        # The database is opened on first use so importing this module has no side effects.
+        if self._db is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def get(self, query: str) -> str | None:
+        with self._lock:
+            key = normalize_query(query)
+            now = time.time()
+
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            db = self._connect()
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    self._remember(key, expires_at, value)
+                    self.stats.disk_hits += 1
+                    return value
+
+            self.stats.misses += 1
+            return None
+
+    def set(self, query: str, value: str, ttl_seconds: float | None = None) -> None:
+        with self._lock:
+            key = normalize_query(query)
+            expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+            self._remember(key, expires_at, value)
+            db = self._connect()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                db.commit()
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            now = time.time()
+            for key in [key for key, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+                db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+
+# Shared by every SearchManager in the process.
+search_cache = SearchCache()
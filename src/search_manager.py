@@ -1,14 +1,140 @@
-from agents import Agent, WebSearchTool, trace, Runner, gen_trace_id
-from refinement_agent import refinement_agent, RefinementQuestion, RefinedQuery
-from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
-from writer_agent import writer_agent, ResearchReport
+from agents import Agent, WebSearchTool, trace, Runner, RunConfig, gen_trace_id
+from refinement_agent import refinement_agent, refactor_query_agent, RefinementQuestion, RefinedQuery
+from planner_agent import planner_agent, WebSearchItem, WebSearchPlan, QTY_SEARCHES
+from writer_agent import (writer_agent, ResearchReport, outline_agent, ReportOutline, section_writer_agent, ReportSection,
+                          report_summary_agent, ReportSummary)
 from search_agent import search_agent
+from coverage_agent import coverage_agent, CoverageAssessment
+from research_budget import ResearchBudget
+from search_cache import SearchCache, search_cache, normalize_query
+from search_scheduler import SearchScheduler, search_scheduler
+from checkpoint_store import CheckpointStore, checkpoint_store, REFINED_QUERY, PLAN, SEARCH_RESULT
+from report_store import ReportStore, StoredReport, report_store, REPORT_REUSE
+from context_packer import pack_search_results, novelty, WRITER_TOKEN_BUDGET
+from fake_model import default_run_config
+from metrics import AgentCall, PipelineMetrics, pipeline_metrics
+from model_router import ModelRouter, model_router
+from follow_up_prefetch import (PrefetchCache, PrefetchedResearch, prefetch_cache, PREFETCH_FOLLOW_UPS, PREFETCH_SEARCHES,
+                                 PREFETCH_CONCURRENCY, PREFETCH_BUSY_LOAD, PREFETCH_MAX_WAIT_SECONDS)
+from single_flight import SingleFlight, search_flights, research_flights, COALESCE_SEARCHES, COALESCE_RESEARCH
+from refinement_fastpath import (RefinementMemo, refinement_memo, specificity, is_specific_query, content_words,
+                                 REFINEMENT_FAST_PATH)
+from progress import ProgressBus, ProgressEvent, LOG, STAGE_START, STAGE_END, SEARCH, ERROR, REPORT, STORED_REPORT
+from utils.partial_json import PartialJsonStringReader, PartialJsonArrayReader
+from openai.types.responses import ResponseTextDeltaEvent
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import replace
 import asyncio
+import logging
+import sqlite3
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Set while speculating: speculative work is logged but not shown to the user, who may never need it
+speculating: ContextVar[bool] = ContextVar("speculating", default=False)
+background_tasks: set[asyncio.Task] = set()   # Background prefetches and checkpoint cleanups still running
+
+# Minimum seconds between partial report events while the report is streamed
+REPORT_STREAM_INTERVAL = float(os.getenv('REPORT_STREAM_INTERVAL', '0.25'))
+# Start each search as soon as the planner emits it instead of waiting for the whole plan
+PIPELINED_PLANNING = os.getenv('PIPELINED_PLANNING', 'true').lower() in ('1', 'true', 'yes')
+# Searches started speculatively on the original query while a refinement question is pending (0 disables)
+SPECULATIVE_SEARCHES = int(os.getenv('SPECULATIVE_SEARCHES', '2'))
+# Share of a speculative search's content words that must appear in the refined query for it to be reused;
+# reused searches count towards the first wave of searches of the run
+SPECULATION_RELEVANCE = float(os.getenv('SPECULATION_RELEVANCE', '0.8'))
+# "single" writes the report in one writer call; "map_reduce" outlines it, drafts the sections in parallel
+# and then writes the summary and follow-up questions
+WRITER_MODE = os.getenv('WRITER_MODE', 'single').lower()
+# Search results given to each section in map-reduce mode, the ones most related to the section
+SECTION_SEARCH_RESULTS = int(os.getenv('SECTION_SEARCH_RESULTS', '4'))
+# Send every OpenAI call through one pooled HTTP client (see http_client.py)
+SHARED_HTTP_CLIENT = os.getenv('SHARED_HTTP_CLIENT', 'true').lower() in ('1', 'true', 'yes')
+# Deadline in seconds for each run (refinement to report) and for each stage of it; 0 disables a deadline
+RUN_DEADLINE_SECONDS = float(os.getenv('RUN_DEADLINE_SECONDS', '900'))
+STAGE_DEADLINES = {
+    stage: float(os.getenv(f'{stage.upper()}_DEADLINE_SECONDS', default))
+    for stage, default in (
+        ("refinement", "120"), ("planning", "120"), ("searching", "300"), ("planning_and_searching", "360"),
+        ("coverage", "120"), ("follow_up_searching", "300"), ("writing", "600"),
+    )
+}
+
+
+def word_overlap(text: str, reference: str) -> float:
+    """Share of the content words of `text` that also appear in `reference`."""
+    words = set(content_words(text))
+    if not words:
+        return 0.0
+    return len(words & set(content_words(reference))) / len(words)
+
+
+def relevant_results(topic: str, search_results: list[str], limit: int) -> list[str]:
+    """The `limit` search results that share the most words with `topic`, in their original order.
+
+    All results are returned when none of them shares a word with the topic.
+    """
+    scores = [word_overlap(topic, result) for result in search_results]
+    best = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])[:limit]
+    return [search_results[i] for i in sorted(best)] if best else search_results
 
 class SearchManager:
     
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, cache: SearchCache | None = search_cache,
+                 events: ProgressBus | None = None, stream_report: bool = False,
+                 scheduler: SearchScheduler = search_scheduler, pipelined_planning: bool = PIPELINED_PLANNING,
+                 writer_token_budget: int = WRITER_TOKEN_BUDGET, run_config: RunConfig | None = None,
+                 metrics: PipelineMetrics = pipeline_metrics, refinement_fast_path: bool = REFINEMENT_FAST_PATH,
+                 refinement_memo: RefinementMemo = refinement_memo, speculative_searches: int = SPECULATIVE_SEARCHES,
+                 speculation_relevance: float = SPECULATION_RELEVANCE,
+                 report_store: ReportStore | None = report_store, report_reuse: str = REPORT_REUSE,
+                 interactive_refinement: bool = True, checkpoints: CheckpointStore | None = checkpoint_store,
+                 run_deadline: float = RUN_DEADLINE_SECONDS, stage_deadlines: dict[str, float] | None = None,
+                 router: ModelRouter | None = model_router, writer_mode: str = WRITER_MODE,
+                 prefetch_follow_ups: int = PREFETCH_FOLLOW_UPS, prefetch_searches: bool = PREFETCH_SEARCHES,
+                 prefetch_cache: PrefetchCache | None = prefetch_cache,
+                 search_flights: SingleFlight | None = search_flights if COALESCE_SEARCHES else None,
+                 research_flights: SingleFlight | None = research_flights if COALESCE_RESEARCH else None):
         self.progress_callback = progress_callback
+        self.prefetch_follow_ups = prefetch_follow_ups       # Follow-up questions of each report to plan in the background
+        self.prefetch_searches = prefetch_searches           # Also search the prefetched plans
+        self.prefetch_cache = prefetch_cache                 # Prefetched follow-up research; None disables prefetching
+        self.prefetch_task: asyncio.Task | None = None       # Background prefetch started by the last report
+        self.search_flights = search_flights                 # Identical searches in flight across sessions; None disables sharing
+        self.research_flights = research_flights             # Identical refined queries in flight across sessions; None disables sharing
+        self.router = router                                 # Model per stage with latency-aware fallback; None keeps the agents' models
+        self.run_deadline = run_deadline                     # Seconds for a whole run, 0 for none
+        self.run_timeout: asyncio.Timeout | None = None      # Deadline of the run in progress
+        self.stage_deadlines = stage_deadlines if stage_deadlines is not None else STAGE_DEADLINES  # Seconds per stage
+        self.checkpoints = checkpoints                       # Stage outputs of unfinished runs; None disables resuming
+        self.resume_trace_id: str | None = None              # Failed run that a retry of the same query resumes
+        self.resuming: bool = False                          # Searches of the run in progress may come from its checkpoint
+        self.interactive_refinement = interactive_refinement # False finalizes refinement instead of asking questions
+        self.last_run_calls: list[AgentCall] = []            # Agent calls of the last finished run
+        self.report_store = report_store                     # Finished runs, looked up for similar queries; None disables it
+        self.report_reuse = report_reuse                     # "offer", "serve" or "off" for stored reports of similar queries
+        self.speculative_searches = speculative_searches     # Searches to start while waiting for a refinement answer
+        self.speculation_task: asyncio.Task | None = None    # Plans the original query while a question is pending
+        self.speculation_relevance = speculation_relevance   # Overlap with the refined query a speculative search needs
+        self.speculative_results: list[tuple[WebSearchItem, asyncio.Task]] = []  # Searches started by the speculation
+        self.refinement_fast_path = refinement_fast_path     # Skip the refinement agents for clear-cut queries
+        self.refinement_memo = refinement_memo               # Previously refined queries, shared between sessions
+        self.metrics = metrics                               # Per-agent timing and token usage
+        self.run_trace_id: str | None = None                 # Trace id of the run in progress, used to key metrics
+        self.run_config = run_config if run_config is not None else default_run_config()  # Model backend for every agent run
+        if self.run_config is None and SHARED_HTTP_CLIENT:
+            from http_client import install_shared_client   # Only the OpenAI backend needs the HTTP stack
+            install_shared_client()
+        self.writer_token_budget = writer_token_budget       # Estimated token budget for the packed search results
+        self.writer_mode = writer_mode                       # "single" or "map_reduce" report writing
+        self.pipelined_planning = pipelined_planning         # Overlap planner generation with search execution
+        self.scheduler = scheduler                           # Shared concurrency/rate limits for searches
+        self.events = events if events is not None else ProgressBus()  # Structured progress events for subscribers
+        self.stream_report = stream_report                   # Publish the partial report while it is written
+        self.cache = cache                                   # Shared search result cache, None disables it
         self.refinement_original_query: str | None = None  # Stores the original query
         self.refinement_qas: list[dict[str, str]] = []     # Stores Q/A pairs for refinement
         self.pending_question: bool = False                # Indicates if waiting for user answer
@@ -16,8 +142,11 @@ class SearchManager:
         self.last_question: str | None = None              # Last question asked
         self.current_trace_id: str | None = None            # Save the first trace in openai traces
 
-    async def log(self, message):
-        print(message)
+    async def log(self, message, kind: str = LOG, **fields):
+        logger.info(message)
+        if speculating.get():
+            return
+        self.events.publish(ProgressEvent(kind=kind, message=message, **fields))
         if self.progress_callback:
             try:
                 if asyncio.iscoroutinefunction(self.progress_callback):
@@ -25,28 +154,456 @@ class SearchManager:
                 else:
                     self.progress_callback(message)
             except Exception as e:
-                print(f"Error sending log to server: {e}")
+                logger.warning(f"Error sending log to server: {e}")
+
+    @asynccontextmanager
+    async def stage(self, name: str, message: str):
+        await self.log(message, kind=STAGE_START, stage=name)
+        start = time.monotonic()
+        deadline = self.stage_deadlines.get(name)
+        timeout = asyncio.timeout(deadline or None)
+        try:
+            async with timeout:
+                yield
+        except TimeoutError as e:
+            reason = f"exceeded its {deadline:g}s deadline" if timeout.expired() else f"failed: {e!r}"
+            await self.log(f"{name} {reason}", kind=ERROR, stage=name)
+            raise
+        except Exception as e:
+            await self.log(f"{name} failed: {e}", kind=ERROR, stage=name)
+            raise
+        self.events.publish(ProgressEvent(
+            kind=STAGE_END, stage=name, message=f"{name} finished in {time.monotonic() - start:.1f}s"
+        ))
+
+    @asynccontextmanager
+    async def streamed(self, agent: Agent, input: str, run_config: RunConfig | None):
+        """Starts a streamed agent run and cancels it if the caller stops reading before it completes."""
+        result = Runner.run_streamed(agent, input, run_config=run_config)
+        try:
+            yield result
+        finally:
+            if not result.is_complete:
+                result.cancel()
+
+    @asynccontextmanager
+    async def measure(self, agent: Agent, stage: str, queued_at: float | None = None):
+        """Records wall time, queue wait and token usage of one agent run under the run's trace id.
 
-    async def run(self, query: str):
-        
+        Call `set_usage(result)` on the yielded AgentCall once the run has finished, and run the agent
+        with `routed(call)` so it uses the model the router chose for the stage.
+        """
+        call = AgentCall(agent=agent.name, stage=stage)
+        if self.router is not None:
+            call.model = self.router.choose(stage)
+        if queued_at is not None:
+            call.queue_wait = call.started_at - queued_at
+        try:
+            yield call
+        except BaseException as e:
+            call.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+            raise
+        finally:
+            call.wall_time = time.monotonic() - call.started_at
+            self.metrics.record(self.run_trace_id, call)
+            if call.model is not None and call.status != "cancelled":
+                self.router.record(call.model, call.wall_time, call.status == "ok")
+
+    def routed(self, call: AgentCall) -> RunConfig | None:
+        """The run config for an agent run, overriding the agent's model with the one chosen for its call."""
+        if call.model is None:
+            return self.run_config
+        return replace(self.run_config or RunConfig(), model=call.model)
+
+    async def run(self, query: str, budget: ResearchBudget | None = None):
+        # `budget` bounds the searching of this request; the defaults come from the RESEARCH_* settings.
+        # Cancelling the task running this coroutine stops every agent run and search it started.
+        timeout = self.run_timeout = asyncio.timeout(self.run_deadline or None)
+        try:
+            async with timeout:
+                return await self._run(query, budget)
+        except TimeoutError:
+            if timeout.expired():
+                await self.log(f"Research exceeded the {self.run_deadline:g}s run deadline.", kind=ERROR)
+            raise
+
+    async def _run(self, query: str, budget: ResearchBudget | None):
+        budget = budget if budget is not None else ResearchBudget()
+        resumed = await self.take_resumable_run(query)
+        if resumed is not None:
+            self.current_trace_id = resumed[0]
         if self.current_trace_id is None:
             self.current_trace_id = gen_trace_id()
         trace_id = self.current_trace_id
+        self.run_trace_id = trace_id
+        if self.checkpoints is not None:
+            self.checkpoints.start(trace_id)
+        try:
+            return await self._traced_run(query, budget, trace_id, resumed)
+        finally:
+            if self.checkpoints is not None:
+                self.checkpoints.finish(trace_id)
 
+    async def _traced_run(self, query: str, budget: ResearchBudget, trace_id: str, resumed: tuple[str, str] | None):
         with trace("DeepSearch trace", trace_id=trace_id):
             await self.log(f"Starting deep search for query: {query}")
-            refinement_result = await self.query_refinement(query)
-            if isinstance(refinement_result, dict) and not refinement_result.get("is_final", True):
-                return refinement_result
-            if isinstance(refinement_result, dict):
-                refined_query_text = refinement_result.get("query", query)
+            original_query = self.refinement_original_query or query
+            if resumed is not None:
+                refined_query_text = resumed[1]
+                self.current_trace_id = None
+                await self.log(f"Resuming the failed run {trace_id} from its checkpoint: {refined_query_text}")
             else:
-                refined_query_text = query
-            search_plan = await self.plan_searches(refined_query_text)
-            search_results = await self.run_searches(search_plan)
-            report = await self.write_report(refined_query_text, search_results)
+                async with self.stage("refinement", "Refining query."):
+                    refinement_result = await self.query_refinement(query)
+                if isinstance(refinement_result, dict) and not refinement_result.get("is_final", True):
+                    # Use the user's think time to plan and search the original query.
+                    self.start_speculation(self.refinement_original_query or original_query)
+                    return refinement_result
+                if isinstance(refinement_result, dict):
+                    refined_query_text = refinement_result.get("query", query)
+                else:
+                    refined_query_text = query
+                await self.save_checkpoint(trace_id, REFINED_QUERY,
+                                           {"query": original_query, "refined_query": refined_query_text},
+                                           self.resume_key(original_query))
+            stored = await self.find_stored_report(refined_query_text)
+            if stored is not None and self.report_reuse == "serve":
+                self.cancel_speculation()
+                await self.clear_checkpoint(trace_id)
+                await self.log_run_metrics(trace_id)
+                return stored.report
+            try:
+                report = await self.coalesced_research(original_query, refined_query_text, budget, resumed is not None)
+            except asyncio.CancelledError:
+                if self.run_timeout.expired():
+                    self.resume_trace_id = trace_id if self.checkpoints is not None else None
+                else:
+                    # Stopped by the user, a disconnect or a newer request: nothing to resume.
+                    self.discard_checkpoint(trace_id)
+                raise
+            except BaseException:
+                # Keep the checkpoint so that retrying the same query resumes this run.
+                if self.checkpoints is not None:
+                    self.resume_trace_id = trace_id
+                raise
+            await self.clear_checkpoint(trace_id)
+            await self.log_run_metrics(trace_id)
             return report
 
+    async def research(self, original_query: str, refined_query_text: str, budget: ResearchBudget,
+                       resuming: bool = False) -> ResearchReport:
+        """Plans, searches and writes the report for a refined query, checkpointing each stage."""
+        trace_id = self.run_trace_id
+        search_plan = await self.load_checkpointed_plan(trace_id) if resuming else None
+        prefetched = None
+        if search_plan is None and self.prefetch_cache is not None:
+            prefetched = self.prefetch_cache.take(original_query, refined_query_text)
+        self.resuming = resuming
+        budget.start()
+        adopted = []
+        try:
+            if prefetched is not None:
+                search_plan, search_results = await self.run_prefetched(prefetched, budget.initial_searches)
+            elif search_plan is not None:
+                saved = await asyncio.to_thread(self.checkpoints.keys, trace_id, SEARCH_RESULT)
+                done = len({normalize_query(item.query) for item in search_plan.searches} & saved)
+                async with self.stage("searching", f"Resuming {len(search_plan.searches)} planned searches, "
+                                                   f"{done} already completed."):
+                    search_results = await self.run_searches(search_plan)
+            else:
+                # Adopted speculative searches take the place of planned ones.
+                adopted = await self.adopt_speculation(refined_query_text, budget.initial_searches)
+                max_searches = budget.initial_searches - len(adopted)
+                performed = [item.query for item, _ in adopted]
+                if max_searches <= 0:
+                    search_plan, search_results = WebSearchPlan(searches=[]), []
+                elif self.pipelined_planning:
+                    async with self.stage("planning_and_searching", "Planning searches and starting them as they are planned."):
+                        search_plan, search_results = await self.plan_and_run_searches(
+                            refined_query_text, max_searches, performed)
+                else:
+                    async with self.stage("planning", "Planning searches."):
+                        search_plan = await self.plan_searches(refined_query_text, max_searches, performed)
+                    await self.save_checkpoint(trace_id, PLAN, search_plan.model_dump())
+                    async with self.stage("searching", f"Running {len(search_plan.searches)} searches."):
+                        search_results = await self.run_searches(search_plan)
+                if adopted:
+                    reused_items, reused_results = await self.collect_adopted_searches(adopted)
+                    search_plan = WebSearchPlan(searches=reused_items + search_plan.searches)
+                    search_results = reused_results + search_results
+                    await self.save_checkpoint(trace_id, PLAN, search_plan.model_dump())
+            if budget.max_rounds > 0:   # Coverage rounds are opt-in
+                search_results += await self.deepen_research(refined_query_text, search_plan, search_results, budget)
+        finally:
+            self.cancel_speculation()
+            for _, task in adopted:
+                task.cancel()   # No-op for the searches already collected
+            self.resuming = False
+        async with self.stage("writing", "Writing report."):
+            report = await self.write_report(refined_query_text, search_results)
+        await self.save_report(original_query, refined_query_text, search_plan, search_results, report)
+        self.start_prefetch(report)
+        return report
+
+    async def run_prefetched(self, prefetched: PrefetchedResearch, max_searches: int) -> tuple[WebSearchPlan, list[str]]:
+        """Continues the research a background prefetch started for this follow-up question."""
+        search_plan = WebSearchPlan(searches=prefetched.plan.searches[:max_searches])
+        results = prefetched.results[:len(search_plan.searches)]
+        await self.save_checkpoint(self.run_trace_id, PLAN, search_plan.model_dump())
+        remaining = WebSearchPlan(searches=search_plan.searches[len(results):])
+        async with self.stage("searching", f"Using the prefetched plan for this follow-up question, "
+                                           f"{len(results)} of its {len(search_plan.searches)} searches already done."):
+            if remaining.searches:
+                results = results + await self.run_searches(remaining)
+        return search_plan, results
+
+    def start_prefetch(self, report: ResearchReport) -> None:
+        """Plans (and searches) the report's top follow-up questions in the background, at low priority.
+
+        The prefetch runs on its own SearchManager that shares this one's backend, scheduler and caches,
+        so it is not part of this run's progress or metrics trace.
+        """
+        if not self.prefetch_follow_ups or self.prefetch_cache is None:
+            return
+        if self.prefetch_cache.active >= PREFETCH_CONCURRENCY:
+            return   # Enough background work already; prefetching is best effort
+        questions = [question for question in report.follow_up_questions[:self.prefetch_follow_ups]
+                     if not self.prefetch_cache.has(question)]
+        if not questions:
+            return
+        prefetcher = SearchManager(
+            cache=self.cache, scheduler=self.scheduler, run_config=self.run_config, metrics=self.metrics,
+            writer_token_budget=self.writer_token_budget, router=self.router, report_store=None, checkpoints=None,
+            search_flights=self.search_flights, research_flights=None, prefetch_follow_ups=0,
+            prefetch_searches=self.prefetch_searches, prefetch_cache=self.prefetch_cache,
+        )
+        self.prefetch_cache.active += 1
+        self.prefetch_task = asyncio.create_task(prefetcher.prefetch(questions))
+        background_tasks.add(self.prefetch_task)   # Keeps the task alive after the session drops this manager
+        self.prefetch_task.add_done_callback(self._prefetch_finished)
+
+    def _prefetch_finished(self, task: asyncio.Task) -> None:
+        background_tasks.discard(task)
+        self.prefetch_cache.active -= 1
+
+    async def prefetch(self, questions: list[str]) -> None:
+        """Plans, and with `prefetch_searches` also searches, follow-up questions into the prefetch cache.
+
+        Before each agent call it waits until the search scheduler has idle capacity, so foreground
+        runs go first; it gives up when the scheduler stays busy for PREFETCH_MAX_WAIT_SECONDS.
+        """
+        for question in questions:
+            if not await self.wait_for_idle_capacity():
+                return
+            try:
+                plan = await self.plan_searches(question)
+            except Exception as e:
+                logger.warning(f"Prefetching follow-up question failed: {question} ({e!r})")
+                continue
+            results = []
+            if self.prefetch_searches:
+                for item in plan.searches:
+                    if not await self.wait_for_idle_capacity():
+                        break
+                    try:
+                        results.append(await self.search(item))
+                    except Exception as e:
+                        # Keep the searches done so far; the run searches the rest.
+                        logger.warning(f"Prefetched search failed: {item.query} ({e!r})")
+                        break
+            self.prefetch_cache.put(PrefetchedResearch(question=question, plan=plan, results=results))
+            logger.info(f"Prefetched follow-up question ({len(results)} searches): {question}")
+
+    async def wait_for_idle_capacity(self) -> bool:
+        try:
+            async with asyncio.timeout(PREFETCH_MAX_WAIT_SECONDS):
+                await self.scheduler.wait_for_load_below(PREFETCH_BUSY_LOAD)
+        except TimeoutError:
+            logger.info("Search scheduler stayed busy, stopping the follow-up prefetch.")
+            return False
+        return True
+
+    async def coalesced_research(self, original_query: str, refined_query_text: str, budget: ResearchBudget,
+                                 resuming: bool = False) -> ResearchReport:
+        """Runs `research`, or waits for the report of an identical refined query already being researched.
+
+        A run that joins another gets that run's report without its progress events, and its own budget is not used.
+        """
+        if self.research_flights is None or resuming:
+            return await self.research(original_query, refined_query_text, budget, resuming)
+        key = normalize_query(refined_query_text)
+        if self.research_flights.in_flight(key):
+            await self.log("Joining an identical research run already in progress; waiting for its report.")
+        return await self.research_flights.do(
+            key, lambda: self.research(original_query, refined_query_text, budget)
+        )
+
+    async def take_resumable_run(self, query: str) -> tuple[str, str] | None:
+        """Returns (trace id, refined query) of the failed run to resume if `query` retries it.
+
+        That is the session's own failed run or, without refinement questions (a batch rerun, or after
+        a restart), the most recent unfinished non-interactive run of the same query in the checkpoint
+        store. Interactive runs hold the user's refinement answers, so only their own session resumes them.
+        """
+        trace_id, self.resume_trace_id = self.resume_trace_id, None
+        if self.checkpoints is None or self.pending_question:
+            return None
+        key = self.resume_key(query)
+        try:
+            if trace_id is not None:
+                saved = await asyncio.to_thread(self.checkpoints.get, trace_id, REFINED_QUERY, key)
+                if saved is not None:
+                    return trace_id, saved["refined_query"]
+                await asyncio.to_thread(self.checkpoints.clear, trace_id)   # A different query: the failed run is abandoned
+            if self.interactive_refinement:
+                return None
+            unfinished = await asyncio.to_thread(self.checkpoints.take_unfinished, REFINED_QUERY, key)
+            if unfinished is not None:
+                trace_id, saved = unfinished
+                return trace_id, saved["refined_query"]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the checkpoints of {query!r}: {e!r}")
+        return None
+
+    def resume_key(self, query: str) -> str:
+        # Interactive runs are keyed apart so that store-wide lookups never find them.
+        key = normalize_query(query)
+        return f"interactive:{key}" if self.interactive_refinement else key
+
+    async def load_checkpointed_plan(self, trace_id: str) -> WebSearchPlan | None:
+        try:
+            saved = await asyncio.to_thread(self.checkpoints.get, trace_id, PLAN)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the checkpoint of {trace_id}: {e!r}")
+            return None
+        return WebSearchPlan.model_validate(saved) if saved is not None else None
+
+    async def save_checkpoint(self, trace_id: str, stage: str, value, key: str = "") -> None:
+        # Checkpoints only speed up retries, so failing to write one never fails the run.
+        if self.checkpoints is None:
+            return
+        try:
+            await asyncio.to_thread(self.checkpoints.save, trace_id, stage, value, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not checkpoint {stage} of {trace_id}: {e!r}")
+
+    def discard_checkpoint(self, trace_id: str) -> None:
+        """Clears a checkpoint in the background, for a run that is being cancelled."""
+        if self.checkpoints is None:
+            return
+        task = asyncio.create_task(self.clear_checkpoint(trace_id))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    async def clear_checkpoint(self, trace_id: str) -> None:
+        if self.checkpoints is None:
+            return
+        try:
+            await asyncio.to_thread(self.checkpoints.clear, trace_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not clear the checkpoint of {trace_id}: {e!r}")
+
+    async def find_stored_report(self, refined_query: str) -> StoredReport | None:
+        """Looks up a recent report for a near-identical refined query and, when offering, publishes it."""
+        if self.report_store is None or self.report_reuse not in ("offer", "serve"):
+            return None
+        try:
+            match = await asyncio.to_thread(self.report_store.find_similar, refined_query)
+        except sqlite3.Error as e:
+            logger.warning(f"Report store lookup failed: {e!r}")
+            return None
+        if match is None:
+            return None
+        stored, score = match
+        age_hours = (time.time() - stored.created_at) / 3600
+        if self.report_reuse == "serve":
+            await self.log(f"Serving the stored report for a similar query ({score:.0%} match, "
+                           f"{age_hours:.1f}h old): {stored.refined_query}")
+        else:
+            await self.log(f"Found a stored report for a similar query ({score:.0%} match, {age_hours:.1f}h old), "
+                           f"showing it while a fresh one is prepared.",
+                           kind=STORED_REPORT, data=stored)
+        return stored
+
+    async def save_report(self, query: str, refined_query: str, search_plan: WebSearchPlan, search_results: list[str],
+                          report: ResearchReport) -> None:
+        if self.report_store is None:
+            return
+        try:
+            await asyncio.to_thread(self.report_store.save, query, refined_query, search_plan, search_results, report)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store the report: {e!r}")
+
+    def start_speculation(self, query: str) -> None:
+        if self.speculative_searches <= 0 or self.speculation_task is not None:
+            return
+        self.speculation_task = asyncio.create_task(self._speculate(query))
+
+    async def _speculate(self, query: str) -> None:
+        """Plans the original query and starts its first searches while the user answers a question."""
+        speculating.set(True)   # Only affects this task and the searches it starts
+        try:
+            search_plan = await self.plan_searches(query)
+        except Exception as e:
+            logger.info(f"Speculative planning failed: {e!r}")
+            return
+        for item in search_plan.searches[:self.speculative_searches]:
+            self.speculative_results.append((item, asyncio.create_task(self.search(item))))
+
+    async def adopt_speculation(self, refined_query: str, max_searches: int) -> list[tuple[WebSearchItem, asyncio.Task]]:
+        """Returns up to `max_searches` speculative searches still relevant to the refined query and cancels the rest."""
+        task, self.speculation_task = self.speculation_task, None
+        if task is None:
+            return []
+        if not task.done():
+            # Still planning the original query: nothing to reuse yet.
+            task.cancel()
+        speculative, self.speculative_results = self.speculative_results, []
+        adopted = []
+        for item, search_task in speculative:
+            if len(adopted) < max_searches and word_overlap(item.query, refined_query) >= self.speculation_relevance:
+                adopted.append((item, search_task))
+            else:
+                search_task.cancel()
+        if speculative:
+            await self.log(f"Reusing {len(adopted)} of {len(speculative)} speculative searches.")
+        return adopted
+
+    async def collect_adopted_searches(self, adopted: list[tuple[WebSearchItem, asyncio.Task]]
+                                       ) -> tuple[list[WebSearchItem], list[str]]:
+        """The items and results of the adopted speculative searches that succeeded."""
+        items, results = [], []
+        for item, task in adopted:
+            try:
+                result = await task
+            except Exception as e:
+                logger.info(f"Speculative search failed: {item.query} ({e!r})")
+                continue
+            if isinstance(result, str):
+                items.append(item)
+                results.append(result)
+                await self.log(f"Using speculative search results for: {item.query}")
+        return items, results
+
+    def cancel_speculation(self) -> None:
+        if self.speculation_task is not None:
+            self.speculation_task.cancel()
+            self.speculation_task = None
+        for _, task in self.speculative_results:
+            task.cancel()
+        self.speculative_results = []
+
+    def close(self) -> None:
+        """Releases background work; called when the session is dropped."""
+        self.cancel_speculation()
+
+    async def log_run_metrics(self, trace_id: str) -> None:
+        await self.log(f"**Run metrics (trace {trace_id}):**")
+        for line in self.metrics.summarize(trace_id):
+            await self.log(line)
+        self.last_run_calls = self.metrics.calls(trace_id)
+        self.metrics.forget(trace_id)
+
     async def query_refinement(self, query: str):
         # Register the original query or pair the answer to the last question
         if not self.pending_question:
@@ -68,9 +625,26 @@ class SearchManager:
             context_lines.append(f"Answer: {qa['answer']}")
         context = "\n".join(context_lines)
 
+        # Fast path: reuse a previous refinement of the same context, or skip the agents entirely
+        # when the original query is already specific enough.
+        if self.refinement_fast_path:
+            refined_query_text = self.refinement_memo.get(context)
+            if refined_query_text is not None:
+                await self.log("Reusing a previous refinement of this query.")
+                self._reset_refinement_state()
+                return {"is_final": True, "query": refined_query_text}
+            original_query = self.refinement_original_query
+            if not self.refinement_qas and is_specific_query(original_query):
+                _, reasons = specificity(original_query)
+                await self.log(f"Query is specific enough ({'; '.join(reasons)}), skipping refinement.")
+                self._reset_refinement_state()
+                return {"is_final": True, "query": original_query}
+
         # Call the refinement agent with the context
         await self.log("Refining query with context:\n" + context)
-        result = await Runner.run(refinement_agent, context)
+        async with self.measure(refinement_agent, "refinement") as call:
+            result = await Runner.run(refinement_agent, context, run_config=self.routed(call))
+            call.set_usage(result)
 
         # Check if we already have a RefinedQuery (final case after handoff)
         refined_query_text = None
@@ -91,6 +665,17 @@ class SearchManager:
                 question = None
                 is_final = True
 
+        # Without a user to answer, the refactor agent finalizes the query from what we have
+        if not is_final and not self.interactive_refinement:
+            await self.log("Query refinement is not final, finalizing it without asking.")
+            async with self.measure(refactor_query_agent, "refinement") as call:
+                result = await Runner.run(refactor_query_agent, context, run_config=self.routed(call))
+                call.set_usage(result)
+            refined_query_text = result.final_output_as(RefinedQuery).query
+            self.refinement_memo.set(context, refined_query_text)
+            self._reset_refinement_state()
+            return {"is_final": True, "query": refined_query_text}
+
         # If not final and can still ask, return the new question
         if not is_final:
             if self.questions_asked >= 3:
@@ -98,6 +683,7 @@ class SearchManager:
                 try:
                     refined_query_output = result.final_output_as(RefinedQuery)
                     refined_query_text = refined_query_output.query
+                    self.refinement_memo.set(context, refined_query_text)
                 except Exception:
                     refined_query_text = context
                 self._reset_refinement_state()
@@ -116,6 +702,8 @@ class SearchManager:
                 refined_query_text = refined_query_output.query
             except Exception:
                 refined_query_text = context
+        if refined_query_text != context:
+            self.refinement_memo.set(context, refined_query_text)
         await self.log("Final query refinement completed.")
         self._reset_refinement_state()
         return {"is_final": True, "query": refined_query_text}
@@ -129,30 +717,297 @@ class SearchManager:
         self.last_question = None
         self.current_trace_id = None
 
-    async def plan_searches(self, query:str) -> WebSearchPlan:
+    def planner_input(self, query: str, max_searches: int, performed: list[str] = ()) -> str:
+        text = f"{query}\n\nMaximum number of searches: {max_searches}"
+        if performed:
+            text += "\n\nAlready searched, plan other searches:\n" + "\n".join(f"- {search}" for search in performed)
+        return text
+
+    async def plan_searches(self, query:str, max_searches: int = QTY_SEARCHES, performed: list[str] = ()) -> WebSearchPlan:
         await self.log(f"**Planning searches for query: {query}**")
-        result = await Runner.run(planner_agent, query)
+        async with self.measure(planner_agent, "planning") as call:
+            result = await Runner.run(planner_agent, self.planner_input(query, max_searches, performed),
+                                      run_config=self.routed(call))
+            call.set_usage(result)
         await self.log("Search plan generated successfully.")
-        return result.final_output_as(WebSearchPlan)
+        search_plan = result.final_output_as(WebSearchPlan)
+        search_plan.searches = search_plan.searches[:max_searches]
+        return search_plan
+
+    async def plan_and_run_searches(self, query: str, max_searches: int = QTY_SEARCHES,
+                                    performed: list[str] = ()) -> tuple[WebSearchPlan, list[str]]:
+        """Streams the planner output and dispatches each search as soon as its item is complete."""
+        await self.log(f"**Planning searches for query: {query}**")
+        start = time.monotonic()
+        first_dispatch = None
+        dispatched: set[str] = {normalize_query(search) for search in performed}
+        planned: list[WebSearchItem] = []
+        tasks: list[asyncio.Task] = []
+
+        def dispatch(item: WebSearchItem) -> None:
+            nonlocal first_dispatch
+            key = normalize_query(item.query)
+            if key in dispatched or len(planned) >= max_searches:
+                return
+            dispatched.add(key)
+            planned.append(item)
+            if first_dispatch is None:
+                first_dispatch = time.monotonic() - start
+            tasks.append(asyncio.create_task(self._run_search(len(tasks) + 1, item)))
+
+        try:
+            async with (self.measure(planner_agent, "planning") as call,
+                        self.streamed(planner_agent, self.planner_input(query, max_searches, performed),
+                                      self.routed(call)) as result):
+                reader = PartialJsonArrayReader("searches")
+                async for event in result.stream_events():
+                    if event.type != "raw_response_event" or not isinstance(event.data, ResponseTextDeltaEvent):
+                        continue
+                    for raw_item in reader.feed(event.data.delta):
+                        try:
+                            dispatch(WebSearchItem.model_validate(raw_item))
+                        except ValueError:
+                            continue  # Left for the final plan below
+                call.set_usage(result)
+            final_plan = result.final_output_as(WebSearchPlan)
+            planning_time = time.monotonic() - start
+            await self.log("Search plan generated successfully.")
+            # Anything the incremental reader could not pick up is dispatched from the final plan.
+            for item in final_plan.searches:
+                dispatch(item)
+            await self.save_checkpoint(self.run_trace_id, PLAN, WebSearchPlan(searches=planned).model_dump())
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
-    async def run_searches(self, search_plan: WebSearchPlan) -> list[WebSearchItem]:
+        total_time = time.monotonic() - start
+        await self.log(
+            f"Planning took {planning_time:.1f}s, first search started after {first_dispatch if first_dispatch is not None else planning_time:.1f}s, "
+            f"planning and searching took {total_time:.1f}s in total."
+        )
+        return WebSearchPlan(searches=planned), await self._collect_search_results(results, len(tasks))
+
+    async def deepen_research(self, query: str, search_plan: WebSearchPlan, search_results: list[str],
+                              budget: ResearchBudget) -> list[str]:
+        """Runs rounds of follow-up searches for the gaps the coverage agent finds.
+
+        Stops when coverage is sufficient, the budget is spent or a round adds too little new
+        information. Returns the results of the follow-up searches.
+        """
+        searched = [item.query for item in search_plan.searches]
+        seen = {normalize_query(search) for search in searched}
+        results = list(search_results)
+        rounds = 0
+        while True:
+            reason = budget.exhausted(len(searched), self.metrics.tokens(self.run_trace_id), rounds)
+            if reason is not None:
+                await self.log(f"Research budget spent ({reason}), no more follow-up searches.")
+                break
+            try:
+                async with self.stage("coverage", "Checking research coverage."):
+                    assessment = await self.assess_coverage(query, searched, results)
+            except Exception:
+                break  # Already reported by the stage; write with what we have
+            items = []
+            for item in assessment.searches:
+                key = normalize_query(item.query)
+                if key not in seen and len(searched) + len(items) < budget.max_searches:
+                    seen.add(key)
+                    items.append(item)
+            if assessment.is_sufficient or not items:
+                await self.log("Research coverage is sufficient.")
+                break
+            rounds += 1
+            searched += [item.query for item in items]
+            await self.log(f"Coverage gaps: {'; '.join(assessment.missing_aspects) or 'unspecified'}")
+            try:
+                async with self.stage("follow_up_searching", f"Running {len(items)} follow-up searches (round {rounds})."):
+                    try:
+                        found = await self.run_searches(WebSearchPlan(searches=items))
+                    except RuntimeError:
+                        found = []
+            except TimeoutError:
+                found = []   # Out of time for this round: write with what we have
+            gained = novelty(results, found)
+            results += found
+            if gained < budget.min_novelty:
+                await self.log(f"Round {rounds} added only {gained:.0%} new information, stopping.")
+                break
+        return results[len(search_results):]
+
+    async def assess_coverage(self, query: str, searched: list[str], search_results: list[str]) -> CoverageAssessment:
+        packed = pack_search_results(query, search_results, self.writer_token_budget)
+        input = ("Searches already performed:\n" + "\n".join(f"- {search}" for search in searched)
+                 + "\n\n" + packed.text)
+        async with self.measure(coverage_agent, "coverage") as call:
+            result = await Runner.run(coverage_agent, input, run_config=self.routed(call))
+            call.set_usage(result)
+        return result.final_output_as(CoverageAssessment)
+
+    async def run_searches(self, search_plan: WebSearchPlan) -> list[str]:
         await self.log("Running searches based on the plan.")
-        search_tasks = [self.search(search_item) for search_item in search_plan.searches]
-        search_results = await asyncio.gather(*search_tasks)
-        await self.log("**All searches completed successfully.**")
+        total = len(search_plan.searches)
+        search_tasks = [self._run_search(index, item, total) for index, item in enumerate(search_plan.searches, 1)]
+        return await self._collect_search_results(await asyncio.gather(*search_tasks), total)
+
+    async def _run_search(self, index: int, item: WebSearchItem, total: int | None = None) -> str | None:
+        # A failed search is reported and skipped so the writer still gets the remaining results.
+        try:
+            result = await self.search(item)
+        except Exception as e:
+            await self.log(f"Search failed: {item.query} ({e!r})", kind=ERROR, index=index, total=total)
+            return None
+        await self.log(f"Search completed: {item.query}", kind=SEARCH, index=index, total=total)
+        return result
+
+    async def _collect_search_results(self, results: list[str | None], total: int) -> list[str]:
+        search_results = [result for result in results if result is not None]
+        if total and not search_results:
+            raise RuntimeError("All searches failed.")
+        if len(search_results) < total:
+            await self.log(f"**{len(search_results)} of {total} searches completed, continuing with partial results.**")
+        else:
+            await self.log("**All searches completed successfully.**")
+        if self.cache is not None:
+            await self.log(f"Search cache: {self.cache.stats}")
         return search_results
 
     async def search(self, item: WebSearchItem) -> str:
-        await self.log("Performing search")
-        result = await Runner.run(search_agent, item.query)
-        await self.log("Search completed.")
+        key = normalize_query(item.query)
+        if self.resuming:
+            try:
+                saved = await asyncio.to_thread(self.checkpoints.get, self.run_trace_id, SEARCH_RESULT, key)
+            except sqlite3.Error:
+                saved = None
+            if saved is not None:
+                await self.log(f"Using checkpointed search results for: {item.query}")
+                return saved
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, item.query)
+            if cached is not None:
+                await self.log(f"Using cached search results for: {item.query}")
+                return cached
+        if self.search_flights is None:
+            output = await self.fresh_search(item)
+        else:
+            # Sessions researching the same topic at once share one search agent call per query.
+            if self.search_flights.in_flight(key):
+                await self.log(f"Joining an identical search already in progress: {item.query}")
+            output = await self.search_flights.do(key, lambda: self.fresh_search(item))
+        if isinstance(output, str):
+            await self.save_checkpoint(self.run_trace_id, SEARCH_RESULT, output, key)
+        return output
+
+    async def fresh_search(self, item: WebSearchItem):
+        await self.log(f"Performing search: {item.query}")
+        queued_at = time.monotonic()
+
+        async def run_search_agent():
+            async with self.measure(search_agent, "search", queued_at) as call:
+                result = await Runner.run(search_agent, item.query, run_config=self.routed(call))
+                call.set_usage(result)
+                return result
+
+        result = await self.scheduler.submit(run_search_agent)
         if hasattr(result, 'final_output'):
-            return result.final_output
+            output = result.final_output
         else:
-            return result
+            output = result
+        if self.cache is not None and isinstance(output, str):
+            await asyncio.to_thread(self.cache.set, item.query, output)
+        return output
 
     async def write_report(self, query:str,search_results:list[str])-> ResearchReport:
+        if self.writer_mode == "map_reduce":
+            return await self.write_report_by_sections(query, search_results)
         await self.log("Running final report.")
-        input = f"Original query ={query}, search results ={search_results}"
-        result = await Runner.run(writer_agent, input)
-        return result.final_output_as(ResearchReport)
\ No newline at end of file
+        packed = pack_search_results(query, search_results, self.writer_token_budget)
+        await self.log(
+            f"Packed search results for the writer: ~{packed.input_tokens} -> ~{packed.packed_tokens} tokens, "
+            f"{packed.duplicates_dropped} duplicate sentences dropped"
+            + (", truncated to fit the budget." if packed.truncated else ".")
+        )
+        input = packed.text
+        if not self.stream_report:
+            async with self.measure(writer_agent, "writing") as call:
+                result = await Runner.run(writer_agent, input, run_config=self.routed(call))
+                call.set_usage(result)
+            return result.final_output_as(ResearchReport)
+
+        # Streaming mode: the writer emits the ResearchReport as JSON, so decode the markdown_content
+        # field as it arrives and publish it. short_summary and follow_up_questions come with the final output.
+        await self.log("Streaming report as it is written.")
+        async with self.measure(writer_agent, "writing") as call, self.streamed(writer_agent, input, self.routed(call)) as result:
+            reader = PartialJsonStringReader("markdown_content")
+            last_sent = 0.0
+            pending = False
+            async for event in result.stream_events():
+                if event.type != "raw_response_event" or not isinstance(event.data, ResponseTextDeltaEvent):
+                    continue
+                if not reader.feed(event.data.delta):
+                    continue
+                pending = True
+                # Publish the first content right away, then throttle to keep update payloads bounded.
+                now = time.monotonic()
+                if now - last_sent >= REPORT_STREAM_INTERVAL:
+                    self.events.publish(ProgressEvent(kind=REPORT, data=reader.value))
+                    last_sent = now
+                    pending = False
+            if pending:
+                self.events.publish(ProgressEvent(kind=REPORT, data=reader.value))
+            call.set_usage(result)
+        return result.final_output_as(ResearchReport)
+
+    async def write_report_by_sections(self, query: str, search_results: list[str]) -> ResearchReport:
+        """Writes the report as an outline, then every section in parallel, then the summary and follow-ups.
+
+        Each section is drafted from the search results most related to it. When the report is
+        streamed, it is published again each time a section is finished.
+        """
+        await self.log("Outlining the report.")
+        packed = pack_search_results(query, search_results, self.writer_token_budget)
+        async with self.measure(outline_agent, "writing") as call:
+            result = await Runner.run(outline_agent, packed.text, run_config=self.routed(call))
+            call.set_usage(result)
+        outline = result.final_output_as(ReportOutline)
+        await self.log(f"Drafting {len(outline.sections)} report sections in parallel.")
+
+        contents = "Outline of the report:\n" + "\n".join(
+            f"{i}. {section.heading}" for i, section in enumerate(outline.sections, 1)
+        )
+        drafts: list[str | None] = [None] * len(outline.sections)
+
+        def assemble() -> str:
+            return "\n\n".join([f"# {outline.title}"] + [draft for draft in drafts if draft])
+
+        async def draft(index: int) -> None:
+            section = outline.sections[index]
+            relevant = relevant_results(f"{section.heading} {section.description}", search_results,
+                                        SECTION_SEARCH_RESULTS)
+            packed = pack_search_results(query, relevant, self.writer_token_budget)
+            input = f"{contents}\n\nSection to write: {section.heading}\n{section.description}\n\n{packed.text}"
+            async with self.measure(section_writer_agent, "writing") as call:
+                result = await Runner.run(section_writer_agent, input, run_config=self.routed(call))
+                call.set_usage(result)
+            drafts[index] = result.final_output_as(ReportSection).markdown_content
+            if self.stream_report:
+                self.events.publish(ProgressEvent(kind=REPORT, data=assemble()))
+
+        tasks = [asyncio.create_task(draft(index)) for index in range(len(outline.sections))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()   # A failed section fails the report; stop drafting the others
+        markdown = assemble()
+
+        await self.log("Summarizing the report.")
+        async with self.measure(report_summary_agent, "writing") as call:
+            result = await Runner.run(report_summary_agent, f"Original query: {query}\n\n{markdown}",
+                                      run_config=self.routed(call))
+            call.set_usage(result)
+        summary = result.final_output_as(ReportSummary)
+        return ResearchReport(short_summary=summary.short_summary, markdown_content=markdown,
+                              follow_up_questions=summary.follow_up_questions)
\ No newline at end of file
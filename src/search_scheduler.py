@@ -0,0 +1,150 @@
+import asyncio
+import os
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+SEARCH_MAX_CONCURRENCY = int(os.getenv('SEARCH_MAX_CONCURRENCY', '8'))
+SEARCH_RATE_PER_SECOND = float(os.getenv('SEARCH_RATE_PER_SECOND', '2'))   # 0 disables rate limiting
+SEARCH_RATE_BURST = int(os.getenv('SEARCH_RATE_BURST', '4'))
+SEARCH_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv('SEARCH_ATTEMPT_TIMEOUT_SECONDS', '60'))
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', '150'))
+SEARCH_MAX_ATTEMPTS = int(os.getenv('SEARCH_MAX_ATTEMPTS', '3'))
+SEARCH_BACKOFF_SECONDS = float(os.getenv('SEARCH_BACKOFF_SECONDS', '1'))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}   # Plus every 5xx
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed call is worth another attempt: timeouts, connection errors, rate limits and 5xx.
+
+    Other errors (bad requests, authentication, invalid output) fail the same way on every attempt.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # openai.APIConnectionError / APITimeoutError have no status code; APIStatusError has status_code.
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status in RETRYABLE_STATUS_CODES or status >= 500)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # The lock makes waiters take tokens in arrival order.
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class SearchScheduler:
+    """Runs search calls with a shared concurrency cap, rate limit, deadlines and retries.
+
+    One scheduler is shared by every SearchManager in the process, so the limits apply
+    across all sessions. Each attempt gets `attempt_timeout` seconds once it holds a concurrency
+    slot and a rate limit token; waiting for those only counts against the overall `deadline`.
+    Attempts that fail with a retryable error are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, max_concurrency: int = SEARCH_MAX_CONCURRENCY, rate_per_second: float = SEARCH_RATE_PER_SECOND,
+                 burst: int = SEARCH_RATE_BURST, attempt_timeout: float = SEARCH_ATTEMPT_TIMEOUT_SECONDS,
+                 deadline: float = SEARCH_DEADLINE_SECONDS, max_attempts: int = SEARCH_MAX_ATTEMPTS,
+                 backoff_seconds: float = SEARCH_BACKOFF_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_second, burst) if rate_per_second > 0 else None
+        self.active = 0       # Calls currently running
+        self.waiting = 0      # Calls waiting for a concurrency slot or a rate limit token
+        self._load_waiters: set[asyncio.Future] = set()   # Woken whenever a call gives up its slot
+
+    def load(self) -> float:
+        """Share of the concurrency cap in use; above 1 when calls are waiting for a slot or a token."""
+        return (self.active + self.waiting) / max(1, self.max_concurrency)
+
+    async def wait_for_load_below(self, load: float) -> None:
+        """Waits until `load()` is below `load`, checking again each time a call releases its slot."""
+        while self.load() >= load:
+            waiter = asyncio.get_running_loop().create_future()
+            self._load_waiters.add(waiter)
+            try:
+                await waiter
+            finally:
+                self._load_waiters.discard(waiter)
+
+    def _wake_load_waiters(self) -> None:
+        for waiter in self._load_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def submit(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Runs `call()` under the scheduler's limits and returns its result.
+
+        Raises the error of the last attempt (or TimeoutError) once the attempts or the deadline are
+        exhausted, and right away for errors that are not retryable.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with asyncio.timeout_at(deadline_at):
+                    return await self._attempt(call)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                # Full jitter keeps retries from many sessions from hitting the provider in lockstep.
+                delay = random.uniform(0, self.backoff_seconds * 2 ** (attempt - 1))
+                if loop.time() + delay >= deadline_at:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, call: Callable[[], Awaitable[T]]) -> T:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            if self._bucket is not None:
+                self.waiting += 1
+                try:
+                    await self._bucket.acquire()
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            try:
+                async with asyncio.timeout(self.attempt_timeout):   # Only the call itself, not the queueing
+                    return await call()
+            finally:
+                self.active -= 1
+        finally:
+            self._semaphore.release()
+            self._wake_load_waiters()
+
+
+# Shared by every SearchManager in the process.
+search_scheduler = SearchScheduler()
@@ -0,0 +1,309 @@
+"""
+Headless HTTP API for the research pipeline, without Gradio
+
+    POST /research   {"query": "...", "session_id": "...", "budget": {...}}  -> progress as Server-Sent Events
+    GET  /healthz    startup timings, sessions and queued searches; "ready" once the pipeline is imported
+    GET  /metrics    per-agent metrics in Prometheus text format
+
+The response to /research is an event stream: a `session` event with the session id to send
+with the answer to a refinement question, the progress events of the run (`log`,
+`stage_start`, `stage_end`, `search`, `error`, `report`, `stored_report`) and a final
+`question`, `result` or `failed` event. The optional `budget` overrides the research budget of
+the run (max_searches, max_rounds, max_seconds, max_tokens, min_novelty), e.g. {"max_rounds": 2}
+to let the coverage check add follow-up searches.
+
+Only the standard library is imported at startup. The agents SDK and the pipeline are imported
+in the background once the port is open, so the worker accepts connections right away and
+/healthz reports when it is ready.
+
+    python src/server.py --port 8000
+"""
+import time
+
+STARTED_AT = time.perf_counter()   # Origin of the startup timings
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict
+
+from config import load_env
+
+load_env()
+
+from progress import ProgressEvent, REPORT, STORED_REPORT
+from session_registry import SessionRegistry
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('SERVER_PORT', '8000'))
+# Seconds from startup until the pipeline is imported; exceeding it is logged as a warning
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', '5'))
+MAX_REQUEST_BYTES = 1 << 20
+BUDGET_FIELDS = {"max_searches": int, "max_rounds": int, "max_seconds": float, "max_tokens": int, "min_novelty": float}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes]:
+    """Reads one HTTP/1.1 request; returns method, path, lowercase headers and body."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Request headers too large")
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, "Incomplete request")
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_REQUEST_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def parse_budget(value) -> dict:
+    """Validates the `budget` of a /research body; returns the ResearchBudget fields it overrides."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise HttpError(400, "budget must be an object")
+    budget = {}
+    for name, limit in value.items():
+        kind = BUDGET_FIELDS.get(name)
+        if kind is None:
+            raise HttpError(400, f"Unknown budget field {name!r}")
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)) or limit < 0 or (
+                kind is int and limit != int(limit)):
+            raise HttpError(400, f"budget {name} must be a non-negative {kind.__name__}")
+        budget[name] = kind(limit)
+    return budget
+
+
+def sse(event: str, data) -> bytes:
+    lines = json.dumps(data, ensure_ascii=False).splitlines() or [""]
+    return (f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n").encode()
+
+
+def event_payload(event: ProgressEvent) -> dict:
+    if event.kind == REPORT:
+        return {"markdown": event.data}
+    if event.kind == STORED_REPORT:
+        return {"message": event.message, "refined_query": event.data.refined_query,
+                "report": event.data.report.model_dump()}
+    payload = asdict(event)
+    del payload["kind"], payload["data"]
+    return payload
+
+
+class ResearchServer:
+
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, sessions: SessionRegistry | None = None,
+                 manager_options: dict | None = None):
+        self.host = host
+        self.port = port
+        self.sessions = sessions if sessions is not None else SessionRegistry()
+        self.manager_options = manager_options or {}   # Passed on to every SearchManager
+        self.listening_after: float | None = None       # Seconds from startup until the port was open
+        self.ready_after: float | None = None           # Seconds from startup until the pipeline was imported
+        self._pipeline: asyncio.Task | None = None
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self, warm_up: bool = True) -> None:
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, limit=64 * 1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.listening_after = time.perf_counter() - STARTED_AT
+        logger.info(f"Listening on {self.host}:{self.port} after {self.listening_after:.2f}s")
+        if warm_up:
+            self.pipeline()
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def pipeline(self) -> asyncio.Task:
+        """Imports the pipeline once, off the event loop; await the task for the SearchManager class."""
+        if self._pipeline is None:
+            self._pipeline = asyncio.create_task(self._import_pipeline())
+        return self._pipeline
+
+    async def _import_pipeline(self):
+        module = await asyncio.to_thread(importlib.import_module, "search_manager")
+        self.ready_after = time.perf_counter() - STARTED_AT
+        if self.ready_after > STARTUP_BUDGET_SECONDS:
+            logger.warning(f"Pipeline ready after {self.ready_after:.2f}s, over the {STARTUP_BUDGET_SECONDS:.1f}s budget")
+        else:
+            logger.info(f"Pipeline ready after {self.ready_after:.2f}s")
+        return module.SearchManager
+
+    def searches_waiting(self) -> int:
+        """Searches queued in the sessions' SearchScheduler; 0 until the pipeline is imported."""
+        scheduler = self.manager_options.get("scheduler")
+        if scheduler is None and self.ready_after is not None:
+            scheduler = importlib.import_module("search_scheduler").search_scheduler
+        return scheduler.waiting if scheduler is not None else 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, headers, body = await read_request(reader)
+            if path == "/healthz":
+                await self.respond(writer, 200, {
+                    "status": "ready" if self.ready_after is not None else "starting",
+                    "listening_after": self.listening_after,
+                    "ready_after": self.ready_after,
+                    "sessions": len(self.sessions),
+                    "searches_waiting": self.searches_waiting(),
+                })
+            elif path == "/metrics":
+                from metrics import pipeline_metrics
+                await self.respond(writer, 200, pipeline_metrics.registry.render_prometheus(),
+                                   content_type="text/plain; version=0.0.4; charset=utf-8")
+            elif path == "/research":
+                if method != "POST":
+                    raise HttpError(405, "Use POST")
+                await self.research(reader, writer, body)
+            else:
+                raise HttpError(404, f"No route for {path}")
+        except HttpError as e:
+            await self.respond(writer, e.status, {"error": str(e)})
+        except ConnectionError:
+            pass   # The client went away
+        except Exception as e:
+            logger.exception("Request failed")
+            await self.respond(writer, 500, {"error": repr(e)})
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, body, content_type: str = "application/json") -> None:
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def research(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, body: bytes) -> None:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Body must be JSON")
+        query = payload.get("query") if isinstance(payload, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise HttpError(400, "Missing query")
+        budget_overrides = parse_budget(payload.get("budget"))
+        SearchManager = await self.pipeline()
+        budget = None
+        if budget_overrides:
+            # The pipeline import above has loaded research_budget already.
+            budget = importlib.import_module("research_budget").ResearchBudget(**budget_overrides)
+
+        session_id = str(payload.get("session_id") or uuid.uuid4().hex)
+        session = self.sessions.get(session_id)
+        if session is not None and session.task is not None and not session.task.done():
+            # A new request while the session's run is still going replaces that run.
+            self.sessions.remove(session_id)
+            session = None
+        if session is None:
+            session = self.sessions.create(session_id, SearchManager(**self.manager_options))
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        writer.write(sse("session", {"session_id": session_id}))
+        await writer.drain()
+
+        # Subscribe before starting the run so no event is missed; the subscription ends when the run does.
+        events = session.manager.events.subscribe()
+        session.active = True
+        search_task = asyncio.create_task(session.manager.run(query, budget))
+        session.task = search_task
+        search_task.add_done_callback(lambda _: events.close())
+
+        # The client sends nothing after its request, so end of stream means it disconnected:
+        # cancel the run right away instead of waiting for the next event write to fail.
+        def on_read(read: asyncio.Task) -> None:
+            if read.cancelled() or search_task.done():
+                return
+            if read.exception() is not None or read.result() == b"":
+                self.sessions.remove(session_id, session)
+
+        watch = asyncio.create_task(reader.read(1))
+        watch.add_done_callback(on_read)
+        try:
+            async for event in events:
+                writer.write(sse(event.kind, event_payload(event)))
+                await writer.drain()
+            try:
+                result = await search_task
+            except asyncio.CancelledError:
+                if not search_task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return   # Replaced by a newer request of the session, or the client is gone
+            except Exception as e:
+                resumable = session.manager.resume_trace_id is not None
+                if not resumable:
+                    self.sessions.remove(session_id, session)
+                writer.write(sse("failed", {"message": str(e), "resumable": resumable}))
+                await writer.drain()
+                return
+        finally:
+            watch.cancel()
+            session.active = False
+            if not search_task.done():
+                # The request ended early (write failed or the server is stopping): free the session now.
+                self.sessions.remove(session_id, session)
+
+        if isinstance(result, dict) and not result.get("is_final", True):
+            writer.write(sse("question", {"question": result.get("question")}))
+        else:
+            self.sessions.remove(session_id, session)
+            writer.write(sse("result", {"report": result.model_dump()}))
+        await writer.drain()
+
+
+async def serve(host: str, port: int) -> None:
+    server = ResearchServer(host, port)
+    await server.start()
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from progress import ProgressLog
+
+if TYPE_CHECKING:
+    # Only for annotations: the registry is also used by the headless server, which imports the pipeline lazily.
+    from search_manager import SearchManager
+
+SESSION_TTL_SECONDS = float(os.getenv('SESSION_TTL_SECONDS', '1800'))
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '256'))
+
+
+@dataclass
+class Session:
+    session_id: str
+    manager: "SearchManager"
+    progress_log: ProgressLog = field(default_factory=ProgressLog)
+    active: bool = False                                    # True while a run is in progress
+    task: asyncio.Task | None = None                        # The run in progress, cancelled when the session is removed
+    last_seen: float = field(default_factory=time.monotonic)
+
+
+class SessionRegistry:
+    """Keeps one SearchManager per Gradio (or HTTP API) session.
+
+    Sessions waiting on a refinement answer stay in the registry until they expire
+    (idle for longer than `ttl_seconds`) or are evicted because the registry is full.
+    Active sessions are never evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Session | None:
+        self.evict_expired()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def create(self, session_id: str, manager: "SearchManager") -> Session:
+        self.evict_expired()
+        session = Session(session_id=session_id, manager=manager)
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._evict_overflow(keep=session_id)
+        return session
+
+    def remove(self, session_id: str, session: Session | None = None) -> None:
+        """Drops a session, cancelling its run in progress. With `session`, only if it is still the current one."""
+        if session is not None and self._sessions.get(session_id) is not session:
+            return
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            if session.task is not None and not session.task.done():
+                session.task.cancel()
+            session.manager.close()
+
+    def evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if not session.active and now - session.last_seen > self.ttl_seconds
+        ]
+        for session_id in expired:
+            self.remove(session_id)
+
+    def _evict_overflow(self, keep: str) -> None:
+        # Oldest entries first; skip sessions that are still running.
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session_id != keep and not self._sessions[session_id].active:
+                self.remove(session_id)
@@ -0,0 +1,88 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from config import load_env
+
+load_env()
+
+T = TypeVar("T")
+
+# Concurrent identical searches share one search agent call
+COALESCE_SEARCHES = os.getenv('COALESCE_SEARCHES', 'true').lower() in ('1', 'true', 'yes')
+# Concurrent runs with the same refined query share one plan/search/write; the joining runs
+# get the report but not the progress events of the shared run
+COALESCE_RESEARCH = os.getenv('COALESCE_RESEARCH', 'false').lower() in ('1', 'true', 'yes')
+
+
+class SharedCallCancelled(Exception):
+    """The shared computation was cancelled while a caller other than the one cancelling it waited for it."""
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and hands its result to every concurrent caller.
+
+    The first caller for a key starts `fn()` in its own task; callers arriving while it runs wait
+    for the same task instead of starting another. A caller that is cancelled stops waiting
+    without affecting the others, and the task is cancelled once nobody waits for it any more.
+    If the shared computation fails, the caller that started it gets the error and each caller
+    that joined it runs one fresh attempt (coalesced again among themselves). Finished results
+    are not kept: the next call for the key starts a new computation.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.coalesced = 0   # Calls served by a computation another caller started
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], retry: bool = True) -> T:
+        flight = self._flights.get(key)
+        started = flight is None
+        if started:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        else:
+            self.coalesced += 1
+        try:
+            return await self._wait(flight)
+        except Exception:
+            if started or not retry:
+                raise
+        return await self.do(key, fn, retry=False)
+
+    async def _wait(self, flight: _Flight):
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise   # This caller was cancelled
+            raise SharedCallCancelled("The shared computation was cancelled")
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()   # Nobody is waiting for it any more
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()   # Retrieved here so an error nobody awaited is not reported as unhandled
+
+
+# Shared by every SearchManager in the process.
+search_flights = SingleFlight()
+research_flights = SingleFlight()
@@ -1,48 +1,112 @@
+import re
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
 
 def format_search_plan_as_markdown(result):
     """Format the research report as Markdown for display in Gradio.
     """
     if not result:
         return "No research results available."
-    
+
     # Handle ResearchReport type (from writer_agent)
     if hasattr(result, 'markdown_content') and hasattr(result, 'short_summary'):
         # This is a ResearchReport object
-        md = f"# Research Report\n\n"
-        md += f"## Summary\n\n{result.short_summary}\n\n"
-        md += f"---\n\n"
-        md += f"{result.markdown_content}\n\n"
-        
-        if hasattr(result, 'follow_up_questions') and result.follow_up_questions:
-            md += f"\n\n## Follow-up Questions\n\n"
-            for i, question in enumerate(result.follow_up_questions, 1):
-                md += f"{i}. {question}\n"
-        
-        return md
-    
+        parts = [
+            "# Research Report\n\n",
+            f"## Summary\n\n{result.short_summary}\n\n",
+            "---\n\n",
+            f"{result.markdown_content}\n\n",
+        ]
+        parts += format_follow_up_questions(result)
+        return "".join(parts)
+
     # Handle list of search results (from previous implementation)
     elif isinstance(result, list):
-        md = "## Search Results\n\n"
-        
+        parts = ["## Search Results\n\n"]
+
         for i, item in enumerate(result, 1):
             if hasattr(item, 'final_output'):
-                md += f"### Result {i}: {item.query if hasattr(item, 'query') else ''}\n\n"
-                md += f"{item.final_output}\n\n"
-                md += "---\n\n"
+                parts.append(f"### Result {i}: {item.query if hasattr(item, 'query') else ''}\n\n")
+                parts.append(f"{item.final_output}\n\n")
             elif isinstance(item, str):
-                md += f"### Result {i}\n\n"
-                md += f"{item}\n\n"
-                md += "---\n\n"
+                parts.append(f"### Result {i}\n\n")
+                parts.append(f"{item}\n\n")
             else:
-                md += f"### Result {i}\n\n"
-                md += f"Result format not recognized: {type(item)}\n\n"
-                md += "---\n\n"
-        
-        return md
-    
+                parts.append(f"### Result {i}\n\n")
+                parts.append(f"Result format not recognized: {type(item)}\n\n")
+            parts.append("---\n\n")
+
+        return "".join(parts)
+
     # Handle string or other formats
     elif isinstance(result, str):
         return result
     else:
         return f"Unsupported result type: {type(result)}"
 
+
+def format_follow_up_questions(result) -> list[str]:
+    if not getattr(result, 'follow_up_questions', None):
+        return []
+    return ["\n\n## Follow-up Questions\n\n"] + [
+        f"{i}. {question}\n" for i, question in enumerate(result.follow_up_questions, 1)
+    ]
+
+
+def split_sections(markdown: str) -> list[tuple[str, str]]:
+    """Splits report markdown into (title, markdown) sections at its top-level headings.
+
+    A lone leading `#` title is treated as the document title, so the report is split at the
+    next heading level. Headings inside code blocks are ignored; text before the first heading
+    becomes an "Introduction" section.
+    """
+    lines = markdown.splitlines()
+    headings = []   # (line index, level, title)
+    in_fence = False
+    for index, line in enumerate(lines):
+        if FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and (match := HEADING.match(line)):
+            headings.append((index, len(match.group(1)), match.group(2)))
+    if not headings:
+        return [("Report", markdown.strip())] if markdown.strip() else []
+
+    start = 0
+    if sum(level == 1 for _, level, _ in headings) == 1 and headings[0][1] == 1 and len(headings) > 1:
+        start = headings[0][0] + 1   # Skip the document title
+        headings = headings[1:]
+    level = min(level for _, level, _ in headings)
+    boundaries = [(index, title) for index, heading_level, title in headings if heading_level == level]
+
+    sections = []
+    introduction = "\n".join(lines[start:boundaries[0][0]]).strip()
+    if introduction:
+        sections.append(("Introduction", introduction))
+    for (index, title), (end, _) in zip(boundaries, boundaries[1:] + [(len(lines), None)]):
+        sections.append((title, "\n".join(lines[index:end]).strip()))
+    return sections
+
+
+def format_report_overview(result, sections: list[tuple[str, str]]) -> str:
+    """Summary, table of contents and follow-up questions of a report; sections are shown one at a time."""
+    parts = ["# Research Report\n\n", f"## Summary\n\n{result.short_summary}\n\n", "## Contents\n\n"]
+    parts += [f"{i}. {title}\n" for i, (title, _) in enumerate(sections, 1)]
+    parts.append("\n*Pick a section below to read it.*\n")
+    parts += format_follow_up_questions(result)
+    return "".join(parts)
+
+
+def format_partial_report(markdown: str) -> str:
+    """The report while it is being written: the sections finished so far and the one in progress."""
+    sections = split_sections(markdown)
+    parts = ["# Research Report\n\n*Writing report...*\n\n"]
+    if len(sections) > 1:
+        parts.append("## Contents so far\n\n")
+        parts += [f"{i}. {title}\n" for i, (title, _) in enumerate(sections, 1)]
+        parts.append("\n")
+    parts.append("---\n\n")
+    if sections:
+        parts.append(sections[-1][1])
+    return "".join(parts)
@@ -0,0 +1,134 @@
+import json
+import re
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class PartialJsonStringReader:
+    """Incrementally decodes one string field from a JSON object that is still being streamed.
+
+    Feed the raw text deltas produced by the model; `feed` returns the newly decoded part of
+    the field value, so the total work is linear in the size of the streamed output.
+    """
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*"')
+        self._prefix = ""        # Raw text seen before the field value starts
+        self._pending = ""       # Incomplete escape sequence carried over between deltas
+        self.started = False
+        self.finished = False
+        self.value = ""
+
+    def feed(self, delta: str) -> str:
+        if self.finished:
+            return ""
+        if not self.started:
+            self._prefix += delta
+            match = self._key_pattern.search(self._prefix)
+            if match is None:
+                return ""
+            self.started = True
+            delta = self._prefix[match.end():]
+            self._prefix = ""
+
+        text = self._pending + delta
+        self._pending = ""
+        decoded = []
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self.finished = True
+                break
+            if char != '\\':
+                decoded.append(char)
+                i += 1
+                continue
+            # Escape sequence: wait for the rest of it if the delta ends mid-way.
+            if i + 1 >= len(text):
+                self._pending = text[i:]
+                break
+            code = text[i + 1]
+            if code != 'u':
+                decoded.append(_ESCAPES.get(code, code))
+                i += 2
+                continue
+            if i + 6 > len(text):
+                self._pending = text[i:]
+                break
+            codepoint = int(text[i + 2:i + 6], 16)
+            if 0xD800 <= codepoint < 0xDC00:
+                # High surrogate: decode together with the following low surrogate.
+                if i + 12 > len(text):
+                    self._pending = text[i:]
+                    break
+                decoded.append(json.loads('"' + text[i:i + 12] + '"'))
+                i += 12
+            else:
+                decoded.append(chr(codepoint))
+                i += 6
+
+        new_text = "".join(decoded)
+        self.value += new_text
+        return new_text
+
+
+class PartialJsonArrayReader:
+    """Incrementally extracts the complete objects of one array field from a streamed JSON object.
+
+    `feed` returns the objects of the array that were completed by the given delta, so items
+    can be acted on while the rest of the array is still being generated.
+    """
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self._prefix = ""        # Raw text seen before the array starts
+        self._current = []       # Raw characters of the object being read
+        self._depth = 0          # Nesting depth inside the current array element
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.finished = False
+
+    def feed(self, delta: str) -> list:
+        if self.finished:
+            return []
+        if not self.started:
+            self._prefix += delta
+            match = self._key_pattern.search(self._prefix)
+            if match is None:
+                return []
+            self.started = True
+            delta = self._prefix[match.end():]
+            self._prefix = ""
+
+        completed = []
+        for char in delta:
+            if self._depth == 0:
+                # Between elements: skip separators until the next object or the end of the array.
+                if char == '{':
+                    self._depth = 1
+                    self._current = [char]
+                elif char == ']':
+                    self.finished = True
+                    break
+                continue
+
+            self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(json.loads("".join(self._current)))
+                    self._current = []
+        return completed
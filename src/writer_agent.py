@@ -1,9 +1,9 @@
 import os
 from pydantic import BaseModel, Field
 from agents import Agent
-from dotenv import load_dotenv
+from config import load_env
 
-load_dotenv(override=True)
+load_env()
 model = os.getenv('AI_MODEL', '')
 
 INSTRUCTIONS = (
@@ -27,3 +27,71 @@ writer_agent = Agent(
     model=model,
     output_type=ResearchReport
 )
+
+
+# Map-reduce writing (WRITER_MODE=map_reduce): an outline first, then every section drafted in
+# parallel from the search results relevant to it, then a short pass for the summary and follow-ups.
+
+OUTLINE_INSTRUCTIONS = (
+    "You are a senior researcher planning a report for a research query. "
+    "You will be provided with the original query, and some initial research done by a research assistant.\n"
+    "Produce an outline of 4 to 8 sections that together cover the query in a logical flow, each with a "
+    "heading and one sentence describing what it covers. The summary and follow-up questions are written "
+    "separately, so do not add sections for them. Use the same language as the query."
+)
+
+class OutlineSection(BaseModel):
+    heading: str = Field(description="The heading of the section.")
+    description: str = Field(description="One sentence describing what the section covers.")
+
+
+class ReportOutline(BaseModel):
+    title: str = Field(description="The title of the report.")
+    sections: list[OutlineSection] = Field(description="The sections of the report, in order.")
+
+
+outline_agent = Agent(
+    name="Report Outliner",
+    instructions=OUTLINE_INSTRUCTIONS,
+    model=model,
+    output_type=ReportOutline
+)
+
+SECTION_INSTRUCTIONS = (
+    "You are a senior researcher writing one section of a longer report. "
+    "You will be provided with the original query, the outline of the report, the section to write and "
+    "the research relevant to that section.\n"
+    "Write only that section, in markdown, starting with its heading as a level 2 heading (##). "
+    "It should be detailed and in the same language as the query; leave the topics of the other "
+    "sections to them."
+)
+
+class ReportSection(BaseModel):
+    markdown_content: str = Field(description="The section in markdown format, starting with its heading.")
+
+
+section_writer_agent = Agent(
+    name="Section Writer",
+    instructions=SECTION_INSTRUCTIONS,
+    model=model,
+    output_type=ReportSection
+)
+
+SUMMARY_INSTRUCTIONS = (
+    "You are a senior researcher finishing a report that was written section by section. "
+    "You will be provided with the original query and the report.\n"
+    "Write a short summary of the report and a list of follow-up questions that could be asked based on "
+    "it, in the same language as the query."
+)
+
+class ReportSummary(BaseModel):
+    short_summary: str = Field(description="A short summary of the research report.")
+    follow_up_questions: list[str] = Field(description="A list of follow-up questions that could be asked based on the report.")
+
+
+report_summary_agent = Agent(
+    name="Report Summarizer",
+    instructions=SUMMARY_INSTRUCTIONS,
+    model=model,
+    output_type=ReportSummary
+)
@@ -0,0 +1,126 @@
+"""
+Benchmark for SearchManager.run against the offline fake model backend
+
+Reports per-stage and end-to-end latency percentiles, throughput at each concurrency
+level and memory growth over the runs. No API access is needed.
+
+    python tests/benchmark_search_manager.py --runs 20 --concurrency 1 4 16 --latency-scale 0.05
+"""
+import argparse
+import asyncio
+import gc
+import statistics
+import sys
+import os
+import time
+import tracemalloc
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+from conftest import isolated_manager_options
+from fake_model import FakeModelConfig, fake_run_config
+from progress import STAGE_START, STAGE_END
+from search_manager import SearchManager
+from search_scheduler import SearchScheduler
+
+set_tracing_disabled(True)
+
+ANSWER = "Focus on the most recent developments."
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def format_latencies(name: str, values: list[float]) -> str:
+    return (f"  {name:<24} n={len(values):<4} p50={percentile(values, 50):7.3f}s "
+            f"p95={percentile(values, 95):7.3f}s p99={percentile(values, 99):7.3f}s "
+            f"mean={statistics.fmean(values) if values else float('nan'):7.3f}s")
+
+
+async def timed_run(manager: SearchManager, query: str, stages: dict[str, list[float]]) -> float:
+    """Runs one research query to completion, answering refinement questions, and records stage timings."""
+    events = manager.events.subscribe()
+    start = time.perf_counter()
+    result = await manager.run(query)
+    while isinstance(result, dict) and not result.get("is_final", True):
+        result = await manager.run(ANSWER)
+    elapsed = time.perf_counter() - start
+
+    started: dict[str, float] = {}
+    for event in events.drain():
+        if event.kind == STAGE_START:
+            started[event.stage] = event.timestamp
+        elif event.kind == STAGE_END and event.stage in started:
+            stages.setdefault(event.stage, []).append(event.timestamp - started.pop(event.stage))
+    events.close()
+    return elapsed
+
+
+async def run_level(args, concurrency: int, config: FakeModelConfig, **manager_options) -> None:
+    scheduler = SearchScheduler(max_concurrency=args.search_concurrency, rate_per_second=0)
+    run_config = fake_run_config(config)
+    stages: dict[str, list[float]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> float:
+        async with semaphore:
+            manager = SearchManager(**isolated_manager_options(scheduler=scheduler, run_config=run_config,
+                                                               **manager_options))
+            return await timed_run(manager, f"benchmark topic {index}", stages)
+
+    gc.collect()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    end_to_end = await asyncio.gather(*(one(index) for index in range(args.runs)))
+    wall = time.perf_counter() - start
+    gc.collect()
+    memory_after = tracemalloc.get_traced_memory()[0]
+
+    options = ", ".join(f"{key}={value}" for key, value in manager_options.items())
+    print(f"concurrency={concurrency} {options}")
+    print(format_latencies("end_to_end", end_to_end))
+    for stage, values in stages.items():
+        print(format_latencies(stage, values))
+    print(f"  throughput               {args.runs / wall:.2f} runs/s over {wall:.2f}s")
+    print(f"  memory growth            {(memory_after - memory_before) / 1024:.1f} KiB "
+          f"({(memory_after - memory_before) / 1024 / args.runs:.1f} KiB/run)")
+
+
+async def main(args) -> None:
+    config = FakeModelConfig(
+        latency_scale=args.latency_scale,
+        failure_rate={"search": args.search_failure_rate} if args.search_failure_rate else {},
+        question_probability=args.question_probability,
+        seed=args.seed,
+    )
+    tracemalloc.start()
+    for concurrency in args.concurrency:
+        for pipelined in args.pipelined:
+            for writer_mode in args.writer_mode:
+                await run_level(args, concurrency, config, pipelined_planning=pipelined, stream_report=args.stream,
+                                writer_mode=writer_mode)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Research runs per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="Multiplier for the fake model latencies")
+    parser.add_argument("--search-failure-rate", type=float, default=0.0)
+    parser.add_argument("--question-probability", type=float, default=0.0)
+    parser.add_argument("--search-concurrency", type=int, default=8, help="Scheduler concurrency cap for searches")
+    parser.add_argument("--pipelined", type=lambda value: value.lower() == "true", nargs="+", default=[False, True],
+                        help="Planning modes to compare (true = pipelined planning, false = sequential)")
+    parser.add_argument("--stream", action="store_true", help="Stream the writer output")
+    parser.add_argument("--writer-mode", nargs="+", choices=("single", "map_reduce"), default=["single"],
+                        help="Report writing modes to compare (single writer call, or map-reduce by sections)")
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
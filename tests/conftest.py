@@ -0,0 +1,65 @@
+"""
+Shared fixtures: SearchManager options that keep each test off the stores and singletons shared by the process
+"""
+import sys
+import os
+
+import pytest
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+from fake_model import FakeModelConfig, fake_run_config
+from model_router import model_router
+from refinement_fastpath import RefinementMemo
+from search_manager import SearchManager
+from search_scheduler import SearchScheduler
+from single_flight import search_flights, research_flights
+
+set_tracing_disabled(True)
+
+
+def isolated_manager_options(config: FakeModelConfig | None = None, **overrides) -> dict:
+    """SearchManager keyword arguments for the fake backend with no cache, stores, router, coalescing or prefetching.
+
+    Every call gets its own scheduler and refinement memo; `overrides` replace any of the defaults.
+    """
+    config = config if config is not None else FakeModelConfig(latency_scale=0, seed=1)
+    options = {
+        "cache": None,
+        "run_config": fake_run_config(config),
+        "scheduler": SearchScheduler(rate_per_second=0),
+        "refinement_memo": RefinementMemo(),
+        "report_store": None,
+        "checkpoints": None,
+        "router": None,
+        "search_flights": None,
+        "research_flights": None,
+        "prefetch_cache": None,
+    }
+    options.update(overrides)
+    return options
+
+
+@pytest.fixture
+def manager_options():
+    """Builds isolated SearchManager options, e.g. for the HTTP server or the batch runner."""
+    return isolated_manager_options
+
+
+@pytest.fixture
+def make_manager():
+    """Builds a SearchManager with isolated options."""
+    def build(config: FakeModelConfig | None = None, **overrides) -> SearchManager:
+        return SearchManager(**isolated_manager_options(config, **overrides))
+    return build
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_singletons():
+    """Starts every test with fresh process-wide model router statistics and in-flight call tables."""
+    model_router.stats.clear()
+    for flights in (search_flights, research_flights):
+        flights.__init__()
+    yield
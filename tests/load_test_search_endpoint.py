@@ -0,0 +1,286 @@
+"""
+Load test for the research endpoints with concurrent clients, against the offline fake model backend
+
+Starts the app in a subprocess with MODEL_BACKEND=fake, then for each concurrency level runs that
+many clients at once. Each client submits a query, answers refinement questions until it gets a
+report, and records the time to the first progress update and to the report. Per level it prints
+the p50/p95/p99 of both, the peak queue depth and the app's resident memory.
+
+    python tests/load_test_search_endpoint.py --clients 1 4 16 --latency-scale 0.05
+    python tests/load_test_search_endpoint.py --target server --clients 1 8 32 --question-probability 0.5
+
+--target gradio (the default) drives the `search` API of the Gradio UI through gradio_client
+(pip install gradio_client); the queue depth is the largest queue size a client saw. --target
+server drives POST /research of src/server.py; the queue depth is the largest number of
+searches /healthz reported waiting in the search scheduler, printed with the peak number of sessions. Extra app settings can be passed with --env KEY=VALUE, e.g.
+--env GRADIO_CONCURRENCY_LIMIT=16.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_search_manager import ANSWER, format_latencies
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+QUERIES = [
+    "Latest Python web frameworks",
+    "Battery chemistry for grid storage",
+    "Open source vector databases",
+    "Remote work productivity research",
+]
+AWAITING_ANSWER = "Awaiting additional information"
+
+
+@dataclass
+class ClientResult:
+    time_to_first_progress: float | None = None
+    time_to_report: float | None = None
+    turns: int = 0
+    max_queue: int = 0
+    error: str | None = None
+
+
+def rss_mb(pid: int) -> float | None:
+    """Resident memory of a process in MB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_app(target: str, port: int, args: argparse.Namespace, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "MODEL_BACKEND": "fake",
+        "FAKE_MODEL_LATENCY_SCALE": str(args.latency_scale),
+        "FAKE_MODEL_QUESTION_PROBABILITY": str(args.question_probability),
+        "GRADIO_SERVER_PORT": str(port),
+        "GRADIO_INBROWSER": "false",
+        # Every run researches from scratch, with its storage in a scratch directory
+        "REPORT_REUSE": "off",
+        "SEARCH_CACHE_PATH": os.path.join(data_dir, "search_cache.sqlite3"),
+        "REPORT_STORE_PATH": os.path.join(data_dir, "reports.sqlite3"),
+        "CHECKPOINT_PATH": os.path.join(data_dir, "checkpoints.sqlite3"),
+    })
+    env.update(setting.split("=", 1) for setting in args.env)
+    script = ["main.py"] if target == "gradio" else ["server.py", "--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen([sys.executable, *script], cwd=SRC, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(target: str, port: int, app: subprocess.Popen, timeout: float = 120) -> float:
+    start = time.perf_counter()
+    url = f"http://127.0.0.1:{port}/" + ("healthz" if target == "server" else "")
+    while time.perf_counter() - start < timeout:
+        if app.poll() is not None:
+            raise RuntimeError(f"The app exited with code {app.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if target == "gradio" or json.load(response)["status"] == "ready":
+                    return time.perf_counter() - start
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"The app was not ready after {timeout:.0f}s")
+
+
+def gradio_client_run(port: int, query: str, max_turns: int) -> ClientResult:
+    from gradio_client import Client
+
+    client = Client(f"http://127.0.0.1:{port}/", verbose=False)   # One client per user: its own session
+    result = ClientResult()
+    start = time.perf_counter()
+    text = query
+    while result.turns < max_turns:
+        result.turns += 1
+        job = client.submit(text, api_name="/search")
+        while not job.done():
+            status = job.status()
+            result.max_queue = max(result.max_queue, status.queue_size or 0)
+            if result.time_to_first_progress is None and job.outputs():
+                result.time_to_first_progress = time.perf_counter() - start
+            time.sleep(0.02)
+        job.result()   # Raises if the run failed
+        outputs = job.outputs()
+        if result.time_to_first_progress is None and outputs:
+            result.time_to_first_progress = time.perf_counter() - start
+        progress = outputs[-1][0] if outputs else ""
+        if AWAITING_ANSWER not in (progress or ""):
+            result.time_to_report = time.perf_counter() - start
+            return result
+        text = ANSWER
+    result.error = f"no report after {max_turns} turns"
+    return result
+
+
+def read_events(response: http.client.HTTPResponse):
+    """Yields (event, data) pairs from a Server-Sent Events response."""
+    event, data = None, []
+    for raw in response:
+        line = raw.decode().rstrip("\n")
+        if line.startswith("event: "):
+            event = line.removeprefix("event: ")
+        elif line.startswith("data: "):
+            data.append(line.removeprefix("data: "))
+        elif not line and event is not None:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+
+def server_client_run(port: int, query: str, max_turns: int) -> ClientResult:
+    result = ClientResult()
+    start = time.perf_counter()
+    payload = {"query": query}
+    while result.turns < max_turns:
+        result.turns += 1
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+        try:
+            connection.request("POST", "/research", json.dumps(payload), {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            if response.status != 200:
+                result.error = f"HTTP {response.status}"
+                return result
+            final = None
+            for event, data in read_events(response):
+                if event == "session":
+                    payload["session_id"] = data["session_id"]
+                elif result.time_to_first_progress is None:
+                    result.time_to_first_progress = time.perf_counter() - start
+                if event in ("question", "result", "failed"):
+                    final = (event, data)
+        finally:
+            connection.close()
+        if final is None or final[0] == "failed":
+            result.error = final[1]["message"] if final else "stream ended without a result"
+            return result
+        if final[0] == "result":
+            result.time_to_report = time.perf_counter() - start
+            return result
+        payload["query"] = ANSWER
+    result.error = f"no report after {max_turns} turns"
+    return result
+
+
+class Monitor:
+    """Samples the app's memory and, for the HTTP server, its sessions and queued searches in the background."""
+
+    def __init__(self, target: str, port: int, pid: int, interval: float = 0.25):
+        self.target = target
+        self.port = port
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss: float | None = None
+        self.peak_sessions = 0
+        self.peak_searches_waiting = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self) -> "Monitor":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            rss = rss_mb(self.pid)
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0.0, rss)
+            if self.target == "server":
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/healthz", timeout=2) as response:
+                        health = json.load(response)
+                    self.peak_sessions = max(self.peak_sessions, health["sessions"])
+                    self.peak_searches_waiting = max(self.peak_searches_waiting, health["searches_waiting"])
+                except (OSError, ValueError):
+                    pass
+            self._stop.wait(self.interval)
+
+
+def run_level(target: str, port: int, pid: int, clients: int, max_turns: int) -> None:
+    run_client = gradio_client_run if target == "gradio" else server_client_run
+    queries = [f"{QUERIES[i % len(QUERIES)]} (client {i})" for i in range(clients)]
+    rss_before = rss_mb(pid)
+    start = time.perf_counter()
+    with Monitor(target, port, pid) as monitor, ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(run_client, port, query, max_turns) for query in queries]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(ClientResult(error=repr(e)))
+    elapsed = time.perf_counter() - start
+
+    done = [r for r in results if r.error is None]
+    errors = [r.error for r in results if r.error is not None]
+    queue = max((r.max_queue for r in results), default=0) if target == "gradio" else monitor.peak_searches_waiting
+    rss_after = rss_mb(pid)
+    print(f"\n{clients} concurrent clients: {len(done)} reports in {elapsed:.2f}s "
+          f"({len(done) / elapsed:.2f} reports/s), {len(errors)} errors, "
+          f"{sum(r.turns for r in results)} turns")
+    print(format_latencies("time to first progress", [r.time_to_first_progress for r in done
+                                                       if r.time_to_first_progress is not None]))
+    print(format_latencies("time to report", [r.time_to_report for r in done]))
+    print(f"  {'peak queue depth':<24} {queue}")
+    if target == "server":
+        print(f"  {'peak sessions':<24} {monitor.peak_sessions}")
+    if rss_before is not None:
+        print(f"  {'server RSS':<24} before={rss_before:.1f}MB peak={monitor.peak_rss or rss_before:.1f}MB "
+              f"after={rss_after:.1f}MB")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("gradio", "server"), default="gradio")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels to run")
+    parser.add_argument("--port", type=int, default=7870)
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="Multiplies the fake model latencies")
+    parser.add_argument("--question-probability", type=float, default=0.5,
+                        help="Probability that a run asks a refinement question first")
+    parser.add_argument("--max-turns", type=int, default=4, help="Refinement answers a client gives at most")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app settings")
+    args = parser.parse_args()
+    if args.target == "gradio":
+        try:
+            import gradio_client  # noqa: F401
+        except ImportError:
+            parser.error("--target gradio needs gradio_client (pip install gradio_client)")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = start_app(args.target, args.port, args, data_dir)
+        try:
+            ready = wait_until_ready(args.target, args.port, app)
+            print(f"{args.target} app ready after {ready:.2f}s (pid {app.pid}, latency scale {args.latency_scale}, "
+                  f"question probability {args.question_probability})")
+            for clients in args.clients:
+                run_level(args.target, args.port, app.pid, clients, args.max_turns)
+        finally:
+            app.terminate()
+            try:
+                app.wait(10)
+            except subprocess.TimeoutExpired:
+                app.kill()
+
+
+if __name__ == "__main__":
+    main()
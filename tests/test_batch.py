@@ -0,0 +1,53 @@
+"""
+Tests for the headless batch runner, against the offline fake model backend
+"""
+import sys
+import os
+import asyncio
+import json
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+from batch import run_batch
+from fake_model import FakeModelConfig
+
+set_tracing_disabled(True)
+
+
+def read_jsonl(path) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def batch(tmp_path, manager_options: dict):
+    return asyncio.run(run_batch(
+        str(tmp_path / "queries.jsonl"), str(tmp_path / "reports.jsonl"), str(tmp_path / "stats.jsonl"),
+        concurrency=2, **manager_options,
+    ))
+
+
+def test_batch_writes_reports_and_stats_without_asking_questions(tmp_path, manager_options):
+    (tmp_path / "queries.jsonl").write_text(
+        '{"id": "a", "query": "Latest frameworks"}\n\n"Rust async runtimes"\n', encoding="utf-8")
+    summary = batch(tmp_path, manager_options(FakeModelConfig(latency_scale=0, question_probability=1.0, seed=1)))
+
+    assert (summary.succeeded, summary.failed, summary.skipped) == (2, 0, 0)
+    reports = read_jsonl(tmp_path / "reports.jsonl")
+    assert sorted(entry["id"] for entry in reports) == ["3", "a"]
+    assert all(entry["report"]["markdown_content"] for entry in reports)
+    stats = read_jsonl(tmp_path / "stats.jsonl")
+    assert all(entry["status"] == "ok" and entry["searches"] > 0 and entry["input_tokens"] > 0 for entry in stats)
+
+
+def test_batch_resumes_without_redoing_finished_queries(tmp_path, manager_options):
+    (tmp_path / "queries.jsonl").write_text(
+        '{"id": "a", "query": "Latest frameworks"}\n{"id": "b", "query": "Rust async runtimes"}\n', encoding="utf-8")
+    # An earlier run finished "a" and was interrupted while writing the next line.
+    (tmp_path / "reports.jsonl").write_text('{"id": "a", "query": "Latest frameworks", "report": {}}\n{"id": "b", "qu',
+                                            encoding="utf-8")
+    summary = batch(tmp_path, manager_options())
+
+    assert (summary.succeeded, summary.skipped) == (1, 1)
+    assert [entry["id"] for entry in read_jsonl(tmp_path / "stats.jsonl")] == ["b"]
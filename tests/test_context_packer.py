@@ -0,0 +1,52 @@
+"""
+Tests for packing search results into the writer input
+"""
+import sys
+import os
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from context_packer import pack_search_results, allocate_budget, estimate_tokens, novelty
+
+
+def test_near_duplicate_sentences_are_dropped_across_results():
+    results = [
+        "Python 3.13 adds an experimental JIT compiler. It also ships a free-threaded build.",
+        "Python 3.13 adds an experimental JIT compiler! Django 5.1 was released in August.",
+    ]
+    packed = pack_search_results("python news", results, token_budget=10_000)
+    assert packed.duplicates_dropped == 1
+    assert packed.text.count("experimental JIT compiler") == 1
+    assert "Django 5.1 was released in August." in packed.text
+    assert not packed.truncated
+
+
+def test_output_is_structured_and_normalized():
+    packed = pack_search_results("q", ["first   line\n  wrapped\n\n\nsecond paragraph"], token_budget=10_000)
+    assert packed.text == (
+        "Original query: q\n\nSearch results:\n\n"
+        "### Result 1\n\nfirst line wrapped\n\nsecond paragraph\n"
+    )
+
+
+def test_packed_text_fits_the_token_budget():
+    results = [" ".join(f"Fact{i} about{j} topic{i}x{j} detail{j}y{i}." for i in range(200)) for j in range(3)]
+    packed = pack_search_results("topic", results, token_budget=500)
+    assert packed.truncated
+    assert packed.packed_tokens <= 500
+    assert packed.text.count("### Result") == 3
+
+
+def test_budget_is_shared_fairly():
+    assert allocate_budget([10, 100, 100], 110) == [10, 50, 50]
+    assert allocate_budget([10, 20], 100) == [10, 20]
+    assert estimate_tokens("abcd" * 10) == 10
+
+
+def test_novelty_counts_only_new_sentences():
+    existing = ["Python 3.13 adds an experimental JIT compiler. It also ships a free-threaded build."]
+    new = ["Python 3.13 adds an experimental JIT compiler. Django 5.1 was released in August."]
+    assert novelty(existing, new) == 0.5
+    assert novelty(existing, existing) == 0.0
+    assert novelty(existing, []) == 0.0
@@ -0,0 +1,346 @@
+"""
+End-to-end SearchManager runs against the offline fake model backend
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+import search_manager
+from checkpoint_store import CheckpointStore, SEARCH_RESULT
+from fake_model import FakeModelConfig
+from follow_up_prefetch import PrefetchCache, PrefetchedResearch
+from planner_agent import WebSearchPlan
+from progress import ERROR, REPORT, SEARCH, STAGE_START, STORED_REPORT
+from report_store import ReportStore
+from research_budget import ResearchBudget
+from search_manager import relevant_results, word_overlap
+from search_scheduler import SearchScheduler
+from writer_agent import ResearchReport
+
+set_tracing_disabled(True)
+
+
+def test_sequential_run_produces_a_report(make_manager):
+    manager = make_manager(pipelined_planning=False)
+    report = asyncio.run(manager.run("Latest frameworks"))
+    assert isinstance(report, ResearchReport)
+    assert report.follow_up_questions
+
+
+def test_pipelined_and_streamed_run_publishes_partial_report(make_manager):
+    async def scenario():
+        manager = make_manager(pipelined_planning=True, stream_report=True)
+        events = manager.events.subscribe()
+        report = await manager.run("Latest frameworks")
+        return report, [event for event in events.drain() if event.kind == REPORT]
+
+    report, partial_reports = asyncio.run(scenario())
+    assert isinstance(report, ResearchReport)
+    assert partial_reports
+    assert partial_reports[-1].data == report.markdown_content
+
+
+def test_refinement_question_then_answer(make_manager):
+    async def scenario():
+        manager = make_manager(FakeModelConfig(latency_scale=0, question_probability=1.0, seed=1))
+        first = await manager.run("Latest frameworks")
+        second = await manager.run("Web frameworks for Python")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["is_final"] is False
+    assert first["question"]
+    assert isinstance(second, ResearchReport)
+
+
+def test_failed_searches_still_produce_a_report(make_manager):
+    config = FakeModelConfig(latency_scale=0, failure_rate={"search": 0.5}, seed=3)
+    manager = make_manager(config, scheduler=SearchScheduler(rate_per_second=0, max_attempts=1))
+    assert isinstance(asyncio.run(manager.run("Latest frameworks")), ResearchReport)
+
+
+def test_specific_query_skips_the_refinement_agent(make_manager):
+    async def scenario():
+        manager = make_manager(FakeModelConfig(latency_scale=0, question_probability=1.0, seed=1))
+        return await manager.run("Compare React vs Vue performance for large enterprise dashboards in 2024")
+
+    assert isinstance(asyncio.run(scenario()), ResearchReport)
+
+
+def test_speculative_searches_are_reused_after_the_answer(make_manager):
+    async def scenario():
+        manager = make_manager(FakeModelConfig(latency_scale=0, question_probability=1.0, seed=1),
+                               speculative_searches=2, speculation_relevance=0.5)
+        events = manager.events.subscribe()
+        await manager.run("Latest frameworks")
+        await manager.speculation_task
+        question_messages = [event.message for event in events.drain()]
+        report = await manager.run("Web frameworks for Python")
+        return report, question_messages, [event.message for event in events.drain()], manager.last_run_calls
+
+    report, question_messages, messages, calls = asyncio.run(scenario())
+    assert isinstance(report, ResearchReport)
+    # Speculation stays out of the progress log while the user answers.
+    assert not any("Planning searches" in message or message.startswith("Performing search:")
+                   for message in question_messages)
+    assert "Reusing 2 of 2 speculative searches." in messages
+    # The two reused searches count towards the three of the first wave: only one more is run.
+    assert sum(call.stage == "search" for call in calls) == 3
+    assert sum(message.startswith("Performing search:") for message in messages) == 1
+
+
+def test_speculative_searches_on_another_topic_are_not_reused():
+    assert word_overlap("latest javascript frameworks 2024", "Latest Python REST API frameworks in 2024") < (
+        search_manager.SPECULATION_RELEVANCE)
+    assert word_overlap("latest python rest frameworks", "Latest Python REST API frameworks in 2024") >= (
+        search_manager.SPECULATION_RELEVANCE)
+
+
+def test_coverage_gaps_trigger_follow_up_searches_within_budget(make_manager):
+    async def scenario(budget):
+        manager = make_manager(FakeModelConfig(latency_scale=0, coverage_gaps=5, seed=1))
+        events = manager.events.subscribe()
+        report = await manager.run("Latest frameworks", budget)
+        return report, list(events.drain())
+
+    report, events = asyncio.run(scenario(ResearchBudget(initial_searches=2, max_searches=5, max_rounds=3)))
+    assert isinstance(report, ResearchReport)
+    searches = [event for event in events if event.kind == SEARCH]
+    assert len(searches) == 5
+    assert any(event.kind == STAGE_START and event.stage == "follow_up_searching" for event in events)
+
+    report, events = asyncio.run(scenario(ResearchBudget(max_rounds=0)))
+    assert isinstance(report, ResearchReport)
+    assert not any(event.kind == STAGE_START and event.stage == "coverage" for event in events)
+    assert not any(event.message.startswith("Research budget spent") for event in events)
+
+
+def test_stored_report_is_offered_or_served_for_a_repeat_query(make_manager):
+    store = ReportStore(path=None)
+
+    async def scenario(reuse):
+        manager = make_manager(report_store=store, report_reuse=reuse)
+        events = manager.events.subscribe()
+        report = await manager.run("Compare React vs Vue performance for large enterprise dashboards in 2024")
+        return report, list(events.drain())
+
+    first, _ = asyncio.run(scenario("offer"))
+    offered, events = asyncio.run(scenario("offer"))
+    assert any(event.kind == STORED_REPORT and event.data.report == first for event in events)
+    assert any(event.kind == STAGE_START and event.stage == "writing" for event in events)
+
+    served, events = asyncio.run(scenario("serve"))
+    assert served == offered
+    assert not any(event.kind == STAGE_START and event.stage == "writing" for event in events)
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_failed_run_resumes_from_its_checkpoint(make_manager, pipelined):
+    checkpoints = CheckpointStore(path=None)
+
+    async def scenario():
+        config = FakeModelConfig(latency_scale=0, failure_rate={"writer": 1.0}, seed=1)
+        manager = make_manager(config, pipelined_planning=pipelined, checkpoints=checkpoints)
+        with pytest.raises(Exception):
+            await manager.run("Latest frameworks")
+        trace_id = manager.resume_trace_id
+        searches = checkpoints.count(trace_id, SEARCH_RESULT)
+        config.failure_rate = {}
+        events = manager.events.subscribe()
+        report = await manager.run("latest frameworks")
+        return trace_id, searches, report, [event.message for event in events.drain()]
+
+    trace_id, searches, report, messages = asyncio.run(scenario())
+    assert searches > 0
+    assert isinstance(report, ResearchReport)
+    assert any(message.startswith("Resuming the failed run") for message in messages)
+    assert not any(message.startswith("Performing search:") for message in messages)
+    assert checkpoints.count(trace_id, SEARCH_RESULT) == 0
+
+
+def test_a_new_manager_resumes_the_unfinished_run_of_the_same_query(make_manager):
+    # As after a restart or in a batch rerun: the failed run is found by its query, not by the session.
+    checkpoints = CheckpointStore(path=None)
+
+    async def scenario():
+        config = FakeModelConfig(latency_scale=0, failure_rate={"writer": 1.0}, seed=1)
+        with pytest.raises(Exception):
+            await make_manager(config, checkpoints=checkpoints, interactive_refinement=False).run("Latest frameworks")
+        config.failure_rate = {}
+        manager = make_manager(config, checkpoints=checkpoints, interactive_refinement=False)
+        events = manager.events.subscribe()
+        await manager.run("latest  frameworks")
+        return [event.message for event in events.drain()]
+
+    messages = asyncio.run(scenario())
+    assert any(message.startswith("Resuming the failed run") for message in messages)
+    assert not any(message.startswith("Performing search:") for message in messages)
+
+
+def test_runs_in_progress_are_not_taken_for_resuming():
+    checkpoints = CheckpointStore(path=None)
+    checkpoints.save("trace_a", "refined_query", {"query": "q", "refined_query": "q"}, key="q")
+    checkpoints.start("trace_a")
+    assert checkpoints.take_unfinished("refined_query", "q") is None
+    checkpoints.finish("trace_a")
+    assert checkpoints.take_unfinished("refined_query", "q") == ("trace_a", {"query": "q", "refined_query": "q"})
+    assert checkpoints.take_unfinished("refined_query", "q") is None   # Taken by the first caller
+
+
+def test_other_sessions_never_resume_interactive_runs(make_manager):
+    checkpoints = CheckpointStore(path=None)
+
+    async def scenario():
+        config = FakeModelConfig(latency_scale=0, failure_rate={"writer": 1.0}, seed=1)
+        with pytest.raises(Exception):
+            await make_manager(config, checkpoints=checkpoints).run("Latest frameworks")
+        config.failure_rate = {}
+        manager = make_manager(config, checkpoints=checkpoints)
+        events = manager.events.subscribe()
+        await manager.run("Latest frameworks")
+        return [event.message for event in events.drain()]
+
+    messages = asyncio.run(scenario())
+    assert not any(message.startswith("Resuming the failed run") for message in messages)
+
+
+def test_cancelled_runs_drop_their_checkpoint(make_manager):
+    checkpoints = CheckpointStore(path=None)
+    scheduler = SearchScheduler(rate_per_second=0)
+
+    async def scenario():
+        config = FakeModelConfig(latency={"refinement": 0, "refactor": 0, "planner": 0, "search": 10}, seed=1)
+        manager = make_manager(config, scheduler=scheduler, checkpoints=checkpoints, interactive_refinement=False)
+        task = asyncio.create_task(manager.run("Latest frameworks"))
+        while scheduler.active == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.gather(*search_manager.background_tasks)
+        return manager.resume_trace_id, checkpoints.take_unfinished("refined_query", "latest frameworks")
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=5)) == (None, None)
+
+
+def test_a_different_query_does_not_resume_the_failed_run(make_manager):
+    async def scenario():
+        config = FakeModelConfig(latency_scale=0, failure_rate={"writer": 1.0}, seed=1)
+        manager = make_manager(config, checkpoints=CheckpointStore(path=None))
+        with pytest.raises(Exception):
+            await manager.run("Latest frameworks")
+        config.failure_rate = {}
+        events = manager.events.subscribe()
+        await manager.run("Rust async runtimes")
+        return [event.message for event in events.drain()]
+
+    messages = asyncio.run(scenario())
+    assert not any(message.startswith("Resuming the failed run") for message in messages)
+    assert any(message.startswith("Performing search:") for message in messages)
+
+
+def test_cancelling_a_run_stops_its_searches(make_manager):
+    scheduler = SearchScheduler(rate_per_second=0)
+
+    async def scenario():
+        config = FakeModelConfig(latency={"refinement": 0, "refactor": 0, "planner": 0, "search": 10}, seed=1)
+        manager = make_manager(config, scheduler=scheduler)
+        task = asyncio.create_task(manager.run("Latest frameworks"))
+        while scheduler.active == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert (scheduler.active, scheduler.waiting) == (0, 0)
+
+
+def test_stage_and_run_deadlines(make_manager):
+    slow = FakeModelConfig(latency={"refinement": 0, "refactor": 0, "planner": 0, "search": 10}, seed=1)
+
+    async def scenario(**deadlines):
+        manager = make_manager(slow, pipelined_planning=False, **deadlines)
+        events = manager.events.subscribe()
+        with pytest.raises(TimeoutError):
+            await manager.run("Latest frameworks")
+        return [event.message for event in events.drain() if event.kind == ERROR]
+
+    errors = asyncio.run(asyncio.wait_for(scenario(stage_deadlines={"searching": 0.1}), timeout=5))
+    assert "searching exceeded its 0.1s deadline" in errors
+    errors = asyncio.run(asyncio.wait_for(scenario(run_deadline=0.1, stage_deadlines={}), timeout=5))
+    assert "Research exceeded the 0.1s run deadline." in errors
+
+
+def test_map_reduce_writer_drafts_every_outlined_section(make_manager):
+    async def scenario():
+        manager = make_manager(FakeModelConfig(latency_scale=0, seed=1, report_sections=4), writer_mode="map_reduce",
+                               stream_report=True)
+        events = manager.events.subscribe()
+        report = await manager.run("Latest frameworks")
+        return manager, report, [event for event in events.drain() if event.kind == REPORT]
+
+    manager, report, partial_reports = asyncio.run(scenario())
+    assert isinstance(report, ResearchReport)
+    headings = [line for line in report.markdown_content.splitlines() if line.startswith("## ")]
+    assert [heading.split(":")[0] for heading in headings] == [f"## Section {i}" for i in range(1, 5)]
+    assert report.short_summary and report.follow_up_questions
+    assert len(partial_reports) == 4
+    assert partial_reports[-1].data == report.markdown_content
+    writers = [call.agent for call in manager.last_run_calls if call.stage == "writing"]
+    assert writers == ["Report Outliner"] + ["Section Writer"] * 4 + ["Report Summarizer"]
+
+
+def test_relevant_results_prefers_overlapping_summaries():
+    results = ["Pricing of cloud GPUs", "Battery chemistry advances", "GPU pricing trends in the cloud"]
+    assert relevant_results("Cloud GPU pricing", results, 2) == [results[0], results[2]]
+    assert relevant_results("Unrelated heading", results, 2) == results
+
+
+def test_follow_up_question_starts_from_the_prefetched_research(make_manager):
+    cache = PrefetchCache()
+
+    async def scenario():
+        first = make_manager(prefetch_follow_ups=1, prefetch_cache=cache, interactive_refinement=False)
+        report = await first.run("Latest frameworks")
+        await first.prefetch_task
+        assert cache.has(report.follow_up_questions[0])
+        second = make_manager(prefetch_cache=cache, interactive_refinement=False)
+        events = second.events.subscribe()
+        await second.run(report.follow_up_questions[0])
+        return second, events.drain()
+
+    second, events = asyncio.run(scenario())
+    assert len(cache) == 0
+    assert any(event.kind == STAGE_START and "prefetched plan" in event.message for event in events)
+    assert "planning" not in {call.stage for call in second.last_run_calls}
+
+
+def test_prefetch_waits_for_idle_search_capacity(make_manager, monkeypatch):
+    monkeypatch.setattr(search_manager, "PREFETCH_MAX_WAIT_SECONDS", 0.05)
+    cache = PrefetchCache()
+    manager = make_manager(prefetch_cache=cache)
+    question = "Which frameworks are fastest?"
+
+    manager.scheduler.active = manager.scheduler.max_concurrency   # Foreground searches use every slot
+    asyncio.run(manager.prefetch([question]))
+    assert not cache.has(question)
+
+    manager.scheduler.active = 0
+    asyncio.run(manager.prefetch([question]))
+    prefetched = cache.take(question)
+    assert prefetched is not None and len(prefetched.results) == len(prefetched.plan.searches)
+
+
+def test_prefetched_entries_expire():
+    cache = PrefetchCache(ttl=0)
+    cache.put(PrefetchedResearch(question="Q", plan=WebSearchPlan(searches=[]), results=[]))
+    assert not cache.has("Q")
+    assert cache.take("Q") is None
@@ -0,0 +1,71 @@
+"""
+Tests for the shared pooled HTTP client and its pool metrics
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+httpx = pytest.importorskip("httpx")
+
+from http_client import PoolMetrics, PooledTransport
+from metrics import MetricsRegistry
+
+
+async def keep_alive_server() -> asyncio.base_events.Server:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_requests_reuse_a_pooled_connection_and_are_measured():
+    registry = MetricsRegistry()
+    metrics = PoolMetrics(registry)
+
+    async def scenario():
+        server = await keep_alive_server()
+        port = server.sockets[0].getsockname()[1]
+        async with httpx.AsyncClient(transport=PooledTransport(metrics)) as client:
+            for _ in range(3):
+                response = await client.get(f"http://127.0.0.1:{port}/")
+                assert response.text == "ok"
+            states = dict((labels["state"], value) for labels, value in metrics.connection_states())
+        server.close()
+        await server.wait_closed()
+        return states
+
+    states = asyncio.run(scenario())
+    assert states == {"active": 0, "idle": 1}
+    text = registry.render_prometheus()
+    assert "deep_research_http_requests_total 3" in text
+    assert "deep_research_http_connections_opened_total 1" in text
+    assert "deep_research_http_pool_wait_seconds_count 3" in text
+
+
+def test_concurrent_requests_wait_for_a_connection_when_the_pool_is_full():
+    registry = MetricsRegistry()
+    metrics = PoolMetrics(registry)
+
+    async def scenario():
+        server = await keep_alive_server()
+        port = server.sockets[0].getsockname()[1]
+        transport = PooledTransport(metrics, limits=httpx.Limits(max_connections=1))
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*(client.get(f"http://127.0.0.1:{port}/") for _ in range(4)))
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(scenario())
+    text = registry.render_prometheus()
+    assert "deep_research_http_connections_opened_total 1" in text
+    assert "deep_research_http_pool_wait_seconds_count 4" in text
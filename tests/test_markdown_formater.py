@@ -0,0 +1,56 @@
+"""
+Tests for the report markdown formatting and section splitting
+"""
+import sys
+import os
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.markdown_formater import (format_partial_report, format_report_overview, format_search_plan_as_markdown,
+                                     split_sections)
+from writer_agent import ResearchReport
+
+REPORT = """# Python web frameworks
+
+Frameworks keep evolving.
+
+## Django
+
+Batteries included.
+
+### ORM
+
+```python
+# Not a heading
+```
+
+## FastAPI
+
+Async first.
+"""
+
+
+def test_sections_split_at_top_level_headings_below_the_title():
+    sections = split_sections(REPORT)
+    assert [title for title, _ in sections] == ["Introduction", "Django", "FastAPI"]
+    assert sections[1][1].startswith("## Django") and "# Not a heading" in sections[1][1]
+    assert split_sections("Just text.") == [("Report", "Just text.")]
+    assert split_sections("") == []
+
+
+def test_overview_lists_sections_and_full_format_is_unchanged():
+    report = ResearchReport(short_summary="Short.", markdown_content=REPORT, follow_up_questions=["Next?"])
+    overview = format_report_overview(report, split_sections(REPORT))
+    assert "1. Introduction\n2. Django\n3. FastAPI\n" in overview
+    assert "Async first." not in overview
+    assert format_search_plan_as_markdown(report) == (
+        f"# Research Report\n\n## Summary\n\nShort.\n\n---\n\n{REPORT}\n\n\n\n## Follow-up Questions\n\n1. Next?\n"
+    )
+
+
+def test_partial_report_shows_only_the_section_in_progress():
+    partial = format_partial_report(REPORT[:-5])
+    assert "3. FastAPI" in partial
+    assert "Batteries included." not in partial
+    assert partial.endswith("Async fi")
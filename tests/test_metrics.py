@@ -0,0 +1,54 @@
+"""
+Tests for the pipeline metrics and their Prometheus rendering
+"""
+import sys
+import os
+import asyncio
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+from metrics import AgentCall, Histogram, PipelineMetrics
+
+set_tracing_disabled(True)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", (1, 5))
+    histogram.observe(0.5, agent="search")
+    histogram.observe(3, agent="search")
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{agent="search",le="1"} 1',
+        'latency_seconds_bucket{agent="search",le="5"} 2',
+        'latency_seconds_bucket{agent="search",le="+Inf"} 2',
+        'latency_seconds_sum{agent="search"} 3.5',
+        'latency_seconds_count{agent="search"} 2',
+    ]
+
+
+def test_calls_are_summarized_per_trace():
+    metrics = PipelineMetrics()
+    metrics.record("trace_a", AgentCall(agent="Search agent", stage="search", wall_time=2, input_tokens=10, output_tokens=5))
+    metrics.record("trace_a", AgentCall(agent="Search agent", stage="search", wall_time=1, queue_wait=0.5, status="error"))
+    metrics.record("trace_b", AgentCall(agent="Research Writer", stage="writing", wall_time=9))
+    assert metrics.summarize("trace_a") == [
+        "search: 2 call(s) (1 failed), 3.0s agent time, max queue wait 0.5s, 10 in / 5 out tokens"
+    ]
+    assert metrics.tokens("trace_a") == 15
+    assert 'deep_research_agent_runs_total{agent="Search agent",stage="search",status="error"} 1' in (
+        metrics.registry.render_prometheus()
+    )
+
+
+def test_every_agent_run_of_a_pipeline_is_measured(make_manager):
+    metrics = PipelineMetrics()
+    manager = make_manager(metrics=metrics)
+    events = manager.events.subscribe()
+    asyncio.run(manager.run("Latest frameworks"))
+    exported = metrics.registry.render_prometheus()
+    for stage in ("refinement", "planning", "search", "writing"):
+        assert f'stage="{stage}"' in exported
+    assert any(event.message.startswith("**Run metrics") for event in events.drain())
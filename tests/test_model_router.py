@@ -0,0 +1,98 @@
+"""
+Tests for per-stage model routing and latency-aware fallback
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import RunConfig, set_tracing_disabled
+from fake_model import FakeModelConfig, FakeModelProvider
+from metrics import MetricsRegistry
+from model_router import ModelRouter
+
+set_tracing_disabled(True)
+
+
+def make_router(**kwargs) -> ModelRouter:
+    kwargs.setdefault("latency_budgets", {"search": 10.0, "writing": 60.0})
+    kwargs.setdefault("probe_seconds", 60.0)
+    return ModelRouter(
+        stage_models={"search": ["small", "small-backup"], "writing": ["large"]},
+        max_error_rate=0.5, alpha=0.5, **kwargs,
+    )
+
+
+def test_unconfigured_stage_keeps_the_agents_model():
+    assert ModelRouter(stage_models={}, latency_budgets={}).choose("search") is None
+
+
+def test_prefers_the_first_healthy_candidate():
+    router = make_router()
+    assert router.choose("search") == "small"
+    router.record("small", 1.0, ok=True)
+    assert router.choose("search") == "small"
+    assert router.choose("writing") == "large"
+
+
+def test_fails_over_on_errors_and_slow_calls():
+    router = make_router()
+    router.record("small", 1.0, ok=False)
+    router.record("small", 1.0, ok=False)
+    assert router.choose("search") == "small-backup"
+
+    router = make_router()
+    router.record("small", 25.0, ok=True)
+    assert router.choose("search") == "small-backup"
+
+
+def test_least_bad_candidate_when_all_are_degraded():
+    router = make_router()
+    for _ in range(2):
+        router.record("small", 1.0, ok=False)
+    router.record("small-backup", 20.0, ok=True)
+    router.record("small", 30.0, ok=True)   # Error rate back under the limit, latency over the budget
+    assert router.degraded("small", "search", time.monotonic())
+    assert router.choose("search") == "small-backup"
+
+
+def test_degraded_model_is_probed_again_after_a_while():
+    router = make_router(probe_seconds=0.05)
+    router.record("small", 1.0, ok=False)
+    router.record("small", 1.0, ok=False)
+    assert router.choose("search") == "small-backup"
+    time.sleep(0.06)
+    assert router.choose("search") == "small"
+
+
+def test_gauges_export_per_model_stats():
+    registry = MetricsRegistry()
+    router = make_router()
+    router.register_metrics(registry)
+    router.record("small", 2.0, ok=True)
+    text = registry.render_prometheus()
+    assert 'deep_research_model_latency_seconds{model="small"} 2' in text
+    assert 'deep_research_model_error_rate{model="small"} 0' in text
+
+
+def test_manager_runs_each_stage_on_its_routed_model(make_manager):
+    provider = FakeModelProvider(FakeModelConfig(latency_scale=0, seed=1))
+    router = ModelRouter(
+        stage_models={"refinement": ["mid"], "planning": ["mid"], "search": ["small"], "coverage": ["small"],
+                      "writing": ["large"]},
+        latency_budgets={},
+    )
+    manager = make_manager(run_config=RunConfig(model_provider=provider, tracing_disabled=True), router=router,
+                           interactive_refinement=False)
+    asyncio.run(manager.run("Latest frameworks"))
+
+    expected = {"refinement": "mid", "planning": "mid", "search": "small", "coverage": "small", "writing": "large"}
+    assert manager.last_run_calls
+    for call in manager.last_run_calls:
+        assert call.model == expected[call.stage]
+    assert set(provider.requested_models) <= {"mid", "small", "large"}
+    assert "large" in provider.requested_models and "small" in provider.requested_models
+    assert router.stats["small"].calls >= 1
@@ -0,0 +1,52 @@
+"""
+Tests for decoding a string field out of a streamed JSON object
+"""
+import sys
+import os
+import json
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.partial_json import PartialJsonStringReader, PartialJsonArrayReader
+
+
+def feed_in_chunks(reader: PartialJsonStringReader, text: str, size: int) -> list[str]:
+    return [reader.feed(text[i:i + size]) for i in range(0, len(text), size)]
+
+
+def test_decodes_field_across_arbitrary_chunk_boundaries():
+    report = {
+        "short_summary": "A \"quoted\" summary",
+        "markdown_content": "# Title\n\nTabs\there, backslash \\ and unicode é 😀",
+        "follow_up_questions": ["Why?"],
+    }
+    raw = json.dumps(report)
+    for size in range(1, 8):
+        reader = PartialJsonStringReader("markdown_content")
+        deltas = feed_in_chunks(reader, raw, size)
+        assert "".join(deltas) == report["markdown_content"]
+        assert reader.value == report["markdown_content"]
+        assert reader.finished
+
+
+def test_nothing_is_returned_before_the_field_starts():
+    reader = PartialJsonStringReader("markdown_content")
+    assert reader.feed('{"short_summary": "only the summary so far') == ""
+    assert not reader.started
+    assert reader.feed('", "markdown_content": "Hel') == "Hel"
+    assert reader.feed('lo') == "lo"
+    assert not reader.finished
+
+
+def test_array_items_are_returned_as_soon_as_they_are_complete():
+    plan = {"searches": [{"reason": "braces { and ] in text", "query": f"query {i}"} for i in range(3)]}
+    raw = json.dumps(plan)
+    for size in range(1, 8):
+        reader = PartialJsonArrayReader("searches")
+        items = [item for delta in feed_in_chunks(reader, raw, size) for item in delta]
+        assert items == plan["searches"]
+        assert reader.finished
+
+    reader = PartialJsonArrayReader("searches")
+    assert reader.feed('{"searches": [{"reason": "r", "query": "first"}, {"reason"') == [{"reason": "r", "query": "first"}]
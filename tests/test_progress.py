@@ -0,0 +1,43 @@
+"""
+Tests for the progress event bus and the incremental progress log
+"""
+import sys
+import os
+import asyncio
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from progress import ProgressBus, ProgressEvent, ProgressLog, LOG, SEARCH, ERROR
+
+
+def test_every_subscriber_receives_events_until_closed():
+    async def scenario():
+        bus = ProgressBus()
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish(ProgressEvent(kind=LOG, message="one"))
+        bus.publish(ProgressEvent(kind=LOG, message="two"))
+        bus.close()
+        return [event.message async for event in first], [event.message async for event in second]
+
+    assert asyncio.run(scenario()) == (["one", "two"], ["one", "two"])
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def scenario():
+        bus = ProgressBus(max_queue=2)
+        subscription = bus.subscribe()
+        for message in ("a", "b", "c"):
+            bus.publish(ProgressEvent(kind=LOG, message=message))
+        return [event.message for event in subscription.drain()]
+
+    assert asyncio.run(scenario()) == ["b", "c"]
+
+
+def test_progress_log_renders_events_and_stays_bounded():
+    log = ProgressLog(max_lines=2)
+    log.append("started")
+    log.append_event(ProgressEvent(kind=SEARCH, message="Search completed: x", index=1, total=3))
+    assert log.render() == "### Progress Log:\n\n- started\n- [1/3] Search completed: x\n"
+    log.append_event(ProgressEvent(kind=ERROR, message="boom"))
+    assert log.render() == "### Progress Log:\n\n- [1/3] Search completed: x\n- **Error:** boom\n"
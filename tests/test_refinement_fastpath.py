@@ -0,0 +1,30 @@
+"""
+Tests for the refinement fast path heuristics and memo
+"""
+import sys
+import os
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from refinement_fastpath import RefinementMemo, is_specific_query
+
+
+def test_vague_queries_go_through_refinement():
+    assert not is_specific_query("Latest frameworks")
+    assert not is_specific_query("history of rome")
+    assert not is_specific_query("AI")
+
+
+def test_detailed_queries_skip_refinement():
+    assert is_specific_query("Compare React vs Vue performance for large enterprise dashboards in 2024")
+    assert is_specific_query("Impact of the EU AI Act on open-source LLM startups since 2023")
+    assert is_specific_query("Qué impacto tuvo la inflación en Argentina entre 2020 y 2023")
+
+
+def test_memo_matches_normalized_context_and_is_bounded():
+    memo = RefinementMemo(max_items=1)
+    memo.set("Original query: Latest frameworks", "Latest Python web frameworks in 2025")
+    assert memo.get("original query:  latest frameworks") == "Latest Python web frameworks in 2025"
+    memo.set("Original query: other", "refined")
+    assert memo.get("Original query: Latest frameworks") is None
@@ -0,0 +1,65 @@
+"""
+Tests for the local report store
+"""
+import sys
+import os
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from planner_agent import WebSearchItem, WebSearchPlan
+from report_store import ReportStore, HashedTfidfIndex
+from writer_agent import ResearchReport
+
+
+def save(store: ReportStore, refined_query: str, summary: str = "A summary.") -> int:
+    plan = WebSearchPlan(searches=[WebSearchItem(reason="relevant", query=refined_query)])
+    report = ResearchReport(short_summary=summary, markdown_content=f"# {refined_query}\n\nDetails.",
+                            follow_up_questions=["What next?"])
+    return store.save(refined_query, refined_query, plan, ["search summary"], report)
+
+
+def test_similar_queries_rank_above_unrelated_ones():
+    index = HashedTfidfIndex()
+    index.add(1, "rust async runtimes compared for web servers")
+    index.add(2, "history of the roman empire")
+    (best, score), *_ = index.query("Comparing Rust async runtimes for web servers")
+    assert best == 1
+    assert score > 0.5
+    assert index.query("roman empire history")[0][0] == 2
+
+
+def test_index_keeps_the_most_recent_texts_and_picks_up_new_ones():
+    index = HashedTfidfIndex(max_items=2)
+    index.add(1, "history of the roman empire")
+    index.add(2, "rust async runtimes compared")
+    assert index.query("roman empire")[0][0] == 1
+    index.add(3, "gardening tips for dry climates")   # Evicts 1 and invalidates the cached matrix
+    fresh = HashedTfidfIndex()
+    fresh.add(2, "rust async runtimes compared")
+    fresh.add(3, "gardening tips for dry climates")
+    assert index.query("gardening in dry climates") == fresh.query("gardening in dry climates")
+    assert 1 not in [id for id, _ in index.query("roman empire")]
+
+
+def test_find_similar_respects_threshold_and_age():
+    store = ReportStore(path=None)
+    save(store, "Python web frameworks performance in 2024")
+    stored, score = store.find_similar("python web frameworks performance in 2024", threshold=0.9)
+    assert stored.report.follow_up_questions == ["What next?"]
+    assert score > 0.99
+    assert store.find_similar("Gardening tips for dry climates", threshold=0.5) is None
+    assert store.find_similar("Python web frameworks performance in 2024", max_age_seconds=-1) is None
+
+
+def test_reports_persist_and_are_full_text_searchable(tmp_path):
+    path = str(tmp_path / "reports.sqlite3")
+    store = ReportStore(path=path)
+    save(store, "Rust async runtimes", summary="Tokio dominates the ecosystem.")
+    save(store, "Roman empire history")
+    store.close()
+
+    reopened = ReportStore(path=path)
+    assert [stored.refined_query for stored in reopened.search("tokio")] == ["Rust async runtimes"]
+    assert reopened.search('"; DROP TABLE reports --') == []
+    assert reopened.find_similar("rust async runtimes")[0].plan.searches[0].query == "Rust async runtimes"
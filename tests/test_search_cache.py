@@ -0,0 +1,63 @@
+"""
+Tests for the search result cache
+"""
+import sys
+import os
+import asyncio
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from search_cache import SearchCache, normalize_query
+
+
+def test_normalize_query_ignores_case_punctuation_and_spacing():
+    assert normalize_query("  Latest  Python frameworks?! ") == normalize_query("latest python, frameworks")
+
+
+def test_memory_hit_and_miss_counters(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"))
+    assert cache.get("python frameworks") is None
+    cache.set("python frameworks", "summary")
+    assert cache.get("Python Frameworks.") == "summary"
+    assert cache.stats.misses == 1
+    assert cache.stats.memory_hits == 1
+
+
+def test_entries_persist_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SearchCache(path=path)
+    cache.set("rust async runtimes", "summary")
+    cache.close()
+
+    reopened = SearchCache(path=path)
+    assert reopened.get("rust async runtimes") == "summary"
+    assert reopened.stats.disk_hits == 1
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.set("old news", "summary", ttl_seconds=-1)
+    assert cache.get("old news") is None
+
+
+def test_memory_layer_is_lru_bounded():
+    cache = SearchCache(path=None, memory_items=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_cache_can_be_used_from_worker_threads(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"), memory_items=1)
+
+    async def scenario():
+        await asyncio.gather(*(asyncio.to_thread(cache.set, f"query {i}", f"summary {i}") for i in range(20)))
+        return await asyncio.gather(*(asyncio.to_thread(cache.get, f"query {i}") for i in range(20)))
+
+    assert asyncio.run(scenario()) == [f"summary {i}" for i in range(20)]
+    assert cache.stats.hits == 20 and cache.stats.disk_hits >= 19
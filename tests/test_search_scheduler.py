@@ -0,0 +1,156 @@
+"""
+Tests for the shared search scheduler
+"""
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from search_scheduler import SearchScheduler, TokenBucket, is_retryable
+
+
+def make_scheduler(**overrides) -> SearchScheduler:
+    settings = dict(max_concurrency=2, rate_per_second=0, burst=1, attempt_timeout=1,
+                    deadline=5, max_attempts=3, backoff_seconds=0.01)
+    settings.update(overrides)
+    return SearchScheduler(**settings)
+
+
+def test_concurrency_is_capped():
+    scheduler = make_scheduler(max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        peak = max(peak, scheduler.active)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(*(scheduler.submit(call) for _ in range(6)))
+
+    assert asyncio.run(scenario()) == ["ok"] * 6
+    assert peak == 2
+
+
+def test_failed_attempts_are_retried():
+    scheduler = make_scheduler(max_attempts=3)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ConnectionError("429")
+        return "ok"
+
+    assert asyncio.run(scheduler.submit(flaky)) == "ok"
+    assert attempts == 3
+
+
+def test_slow_attempts_time_out_and_raise_after_last_attempt():
+    scheduler = make_scheduler(attempt_timeout=0.01, max_attempts=2)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scheduler.submit(slow))
+
+
+def test_queueing_does_not_count_against_the_attempt_timeout():
+    scheduler = make_scheduler(max_concurrency=1, attempt_timeout=0.25, deadline=5)
+    calls = 0
+
+    async def job():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(*(scheduler.submit(job) for _ in range(5)), return_exceptions=True)
+
+    assert asyncio.run(scenario()) == ["ok"] * 5
+    assert calls == 5
+
+
+def test_queue_wait_is_bounded_by_the_deadline():
+    scheduler = make_scheduler(max_concurrency=1, attempt_timeout=1, deadline=0.1, max_attempts=1)
+
+    async def job():
+        await asyncio.sleep(0.3)
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(scheduler.submit(job), scheduler.submit(job), return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, TimeoutError) and isinstance(second, TimeoutError)
+
+
+def test_errors_that_are_not_retryable_fail_right_away():
+    scheduler = make_scheduler(max_attempts=3)
+    attempts = 0
+
+    class AuthenticationError(Exception):
+        status_code = 401
+
+    async def unauthorized():
+        nonlocal attempts
+        attempts += 1
+        raise AuthenticationError("invalid api key")
+
+    with pytest.raises(AuthenticationError):
+        asyncio.run(scheduler.submit(unauthorized))
+    assert attempts == 1
+
+
+def test_retryable_errors():
+    class StatusError(Exception):
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    assert is_retryable(TimeoutError()) and is_retryable(ConnectionError())
+    assert is_retryable(StatusError(429)) and is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400)) and not is_retryable(ValueError("bad output"))
+
+
+def test_load_waiters_wake_when_a_call_finishes():
+    scheduler = make_scheduler(max_concurrency=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        running = asyncio.create_task(scheduler.submit(job))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(scheduler.wait_for_load_below(1))
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        release.set()
+        await asyncio.wait_for(waiter, 1)
+        await running
+        return blocked
+
+    assert asyncio.run(scenario())
+    assert scheduler.load() == 0
+
+
+def test_token_bucket_limits_rate_after_burst():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two tokens are available immediately, the other two take 1/50s each.
+    assert asyncio.run(scenario()) >= 0.035
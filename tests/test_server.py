@@ -0,0 +1,136 @@
+"""
+Tests for the headless HTTP/SSE server, against the offline fake model backend
+"""
+import sys
+import os
+import asyncio
+import json
+import subprocess
+
+# Add the src directory to Python path so the flat module imports resolve
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(SRC)
+
+from agents import set_tracing_disabled
+from fake_model import FakeModelConfig
+from search_scheduler import SearchScheduler
+from server import ResearchServer
+
+set_tracing_disabled(True)
+
+
+def test_server_import_does_not_load_the_ui_or_the_agents_sdk():
+    code = "import sys, server; print(sorted(m for m in ('gradio', 'agents', 'openai') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+async def request(port: int, method: str, path: str, body: dict | None = None) -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), content
+
+
+def parse_events(content: bytes) -> list[tuple[str, dict]]:
+    events = []
+    for block in content.decode().strip().split("\n\n"):
+        lines = block.split("\n")
+        name = lines[0].removeprefix("event: ")
+        events.append((name, json.loads("\n".join(line.removeprefix("data: ") for line in lines[1:]))))
+    return events
+
+
+def test_research_streams_progress_then_question_then_result(manager_options):
+    async def scenario():
+        server = ResearchServer("127.0.0.1", 0, manager_options=manager_options(
+            FakeModelConfig(latency_scale=0, question_probability=1.0, seed=1)))
+        await server.start()
+        await server.pipeline()
+        health = await request(server.port, "GET", "/healthz")
+        first = await request(server.port, "POST", "/research", {"query": "Latest frameworks"})
+        session_id = parse_events(first[1])[0][1]["session_id"]
+        second = await request(server.port, "POST", "/research",
+                               {"query": "Web frameworks for Python", "session_id": session_id})
+        missing = await request(server.port, "POST", "/research", {})
+        await server.close()
+        return health, first, second, missing
+
+    health, first, second, missing = asyncio.run(scenario())
+    assert health[0] == 200 and json.loads(health[1])["status"] == "ready"
+    assert json.loads(health[1])["searches_waiting"] == 0
+    first_events = parse_events(first[1])
+    assert first[0] == 200
+    assert first_events[-1][0] == "question"
+    second_events = parse_events(second[1])
+    assert any(name == "stage_start" for name, _ in second_events)
+    assert second_events[-1][0] == "result"
+    assert second_events[-1][1]["report"]["markdown_content"]
+    assert missing[0] == 400
+
+
+def test_research_budget_can_be_set_per_request(manager_options):
+    async def scenario():
+        server = ResearchServer("127.0.0.1", 0, manager_options=manager_options(
+            FakeModelConfig(latency_scale=0, question_probability=0, coverage_gaps=5, seed=1),
+            interactive_refinement=False))
+        await server.start()
+        default = await request(server.port, "POST", "/research", {"query": "Latest frameworks"})
+        deeper = await request(server.port, "POST", "/research",
+                               {"query": "Latest frameworks", "budget": {"max_rounds": 2, "max_searches": 6}})
+        invalid = [await request(server.port, "POST", "/research", {"query": "Latest frameworks", "budget": budget})
+                   for budget in ({"max_rounds": -1}, {"max_rounds": 1.5}, {"unknown": 1}, [1])]
+        await server.close()
+        return default, deeper, invalid
+
+    default, deeper, invalid = asyncio.run(scenario())
+
+    def stages(response):
+        return {data.get("stage") for name, data in parse_events(response[1]) if name == "stage_start"}
+
+    assert "follow_up_searching" not in stages(default)   # No coverage rounds by default
+    assert "follow_up_searching" in stages(deeper)
+    assert parse_events(deeper[1])[-1][0] == "result"
+    assert [status for status, _ in invalid] == [400] * 4
+
+
+def test_client_disconnect_cancels_the_run(manager_options):
+    scheduler = SearchScheduler(rate_per_second=0)
+
+    async def scenario():
+        config = FakeModelConfig(latency={"refinement": 0, "refactor": 0, "planner": 0, "search": 10}, seed=1)
+        server = ResearchServer("127.0.0.1", 0, manager_options=manager_options(config, scheduler=scheduler))
+        await server.start()
+        await server.pipeline()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        body = json.dumps({"query": "Latest frameworks"}).encode()
+        writer.write(f"POST /research HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        while scheduler.active == 0:
+            await asyncio.sleep(0.01)
+        assert len(server.sessions) == 1
+        writer.close()
+        while len(server.sessions) or scheduler.active:
+            await asyncio.sleep(0.01)
+        await server.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+def test_invalid_content_length_is_rejected(manager_options):
+    async def scenario():
+        server = ResearchServer("127.0.0.1", 0, manager_options=manager_options())
+        await server.start()
+        statuses = []
+        for length in ("abc", "-1"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"POST /research HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            statuses.append(int((await reader.read()).split()[1]))
+            writer.close()
+        await server.close()
+        return statuses
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=5)) == [400, 400]
@@ -0,0 +1,68 @@
+"""
+Tests for the per-session SearchManager registry
+"""
+import sys
+import os
+import time
+import asyncio
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from session_registry import SessionRegistry
+
+
+class StubManager:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_sessions_are_isolated():
+    registry = SessionRegistry()
+    first = registry.create("a", StubManager())
+    second = registry.create("b", StubManager())
+    assert registry.get("a") is first
+    assert registry.get("b") is second
+    assert first.manager is not second.manager
+
+
+def test_idle_sessions_expire_after_ttl():
+    registry = SessionRegistry(ttl_seconds=0.01)
+    idle = registry.create("idle", StubManager())
+    running = registry.create("running", StubManager())
+    running.active = True
+    time.sleep(0.02)
+    assert registry.get("idle") is None
+    assert idle.manager.closed
+    assert registry.get("running") is running
+
+
+def test_least_recently_used_idle_session_is_evicted():
+    registry = SessionRegistry(max_sessions=2)
+    registry.create("a", StubManager())
+    registry.create("b", StubManager())
+    registry.get("a")
+    registry.create("c", StubManager())
+    assert "a" in registry
+    assert "b" not in registry
+    assert "c" in registry
+
+
+def test_removing_a_session_cancels_its_run():
+    async def scenario():
+        registry = SessionRegistry()
+        stale = registry.create("a", StubManager())
+        registry.remove("a")
+        session = registry.create("a", StubManager())
+        session.task = asyncio.create_task(asyncio.sleep(10))
+        registry.remove("a", stale)   # A stale session object does not remove the current one
+        assert registry.get("a") is session
+        registry.remove("a")
+        await asyncio.sleep(0)
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.task.cancelled()
+    assert session.manager.closed
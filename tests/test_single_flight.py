@@ -0,0 +1,152 @@
+"""
+Tests for single-flight coalescing of identical in-flight calls
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add the src directory to Python path so the flat module imports resolve
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from agents import set_tracing_disabled
+from fake_model import FakeModelConfig
+from single_flight import SingleFlight
+
+set_tracing_disabled(True)
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return calls
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [1] * 5
+    assert calls == 1
+    assert flights.coalesced == 4
+    assert len(flights) == 0
+
+
+def test_finished_results_are_not_reused():
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def scenario():
+        return await flights.do("key", compute), await flights.do("key", compute)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_joined_callers_retry_when_the_shared_call_fails():
+    flights = SingleFlight()
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        if attempts == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", flaky) for _ in range(3)), return_exceptions=True)
+
+    first, *joined = asyncio.run(scenario())
+    assert isinstance(first, RuntimeError)
+    assert joined == ["ok", "ok"]
+    assert attempts == 2   # The joined callers' retries are coalesced too
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    cancelled = False
+
+    async def compute():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def scenario():
+        first = asyncio.create_task(flights.do("key", compute))
+        second = asyncio.create_task(flights.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert not cancelled
+
+
+def test_computation_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+
+    async def scenario():
+        stopped = asyncio.Event()
+
+        async def compute():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        callers = [asyncio.create_task(flights.do("key", compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(stopped.wait(), 1)
+        return len(flights)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_concurrent_sessions_share_identical_searches(make_manager):
+    flights = SingleFlight()
+    config = FakeModelConfig(latency_scale=0.01, seed=1)
+    managers = [
+        make_manager(config, interactive_refinement=False, pipelined_planning=False, search_flights=flights)
+        for _ in range(2)
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(manager.run("Latest Python web frameworks") for manager in managers))
+
+    asyncio.run(scenario())
+    searches = [sum(call.stage == "search" for call in manager.last_run_calls) for manager in managers]
+    # Both sessions plan the same searches: each one runs once and the other session joins it.
+    assert flights.coalesced == sum(searches) > 0
+
+
+def test_concurrent_sessions_share_identical_research_runs(make_manager):
+    research = SingleFlight()
+    config = FakeModelConfig(latency_scale=0.01, seed=1)
+    managers = [make_manager(config, interactive_refinement=False, research_flights=research) for _ in range(2)]
+
+    async def scenario():
+        return await asyncio.gather(*(manager.run("Latest Python web frameworks") for manager in managers))
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert research.coalesced == 1